@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark JSON serialization cost for a 100-row agreements page.
+
+Compares the previous path (ORM instances -> jsonable_encoder -> json.dumps,
+which is what FastAPI's default JSONResponse did) with the current one
+(column tuples -> dicts -> orjson). No database connection is needed.
+
+Usage:
+    python -m benchmarks.serialization [--rows 100] [--repeat 2000]
+"""
+
+import argparse
+import json
+import timeit
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse
+
+import models
+import schemas
+from services.serialization import rows_to_dicts, schema_columns
+
+
+class _Row(tuple):
+    """Stand-in for a SQLAlchemy Row: a tuple with `_fields`."""
+    _fields = ()
+
+
+def _make_rows(n: int):
+    now = datetime.now(timezone.utc)
+    keys = tuple(c.key for c in schema_columns(models.Agreement, schemas.AgreementResponse))
+    _Row._fields = keys
+    orm_rows, tuple_rows = [], []
+    org_id = uuid.uuid4()
+    for i in range(n):
+        values = {
+            "id": uuid.uuid4(),
+            "organisation_id": org_id,
+            "client_id": uuid.uuid4(),
+            "policy_id": uuid.uuid4(),
+            "principal_amount_pennies": 120000 + i,
+            "apr_bps": 995,
+            "term_months": 12,
+            "broker_fee_bps": 200,
+            "status": models.AgreementStatusEnum.ACTIVE,
+            "signed_at": now - timedelta(days=i),
+            "activated_at": now - timedelta(days=i - 1),
+            "created_at": now,
+            "updated_at": now,
+        }
+        orm_rows.append(models.Agreement(**values))
+        tuple_rows.append(_Row(values.get(k) for k in keys))
+    return orm_rows, tuple_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    orm_rows, tuple_rows = _make_rows(args.rows)
+
+    def before():
+        return json.dumps(jsonable_encoder({"data": orm_rows})).encode()
+
+    def after():
+        return ORJSONResponse({"data": rows_to_dicts(tuple_rows)}).body
+
+    for name, fn in (("before (ORM + jsonable_encoder + json)", before), ("after (tuples + orjson)", after)):
+        seconds = min(timeit.repeat(fn, number=args.repeat, repeat=3)) / args.repeat
+        print(f"{name:<42} {seconds * 1e6:10.1f} us per {args.rows} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark client-create latency: two commits vs. one unit of work.
+
+"before" replays the previous handler body (insert, commit, refresh, insert
+audit row, commit); "after" uses `UnitOfWork` (insert, flush, audit, commit
+once). Runs against DATABASE_URL in a throwaway organisation that is deleted
+afterwards.
+
+Usage:
+    python -m benchmarks.write_latency [--writes 200]
+"""
+
+import argparse
+import statistics
+import time
+import uuid
+from datetime import datetime
+
+import models
+import schemas
+from database import SessionLocal
+from middleware.auth import AuthContext
+from services.metrics import DB_STATEMENTS
+from services.unit_of_work import UnitOfWork
+
+
+def _statements() -> float:
+    return sum(child.value for child in DB_STATEMENTS._children.values())
+
+
+def _new_client(organisation_id, i: int) -> models.Client:
+    now = datetime.utcnow()
+    return models.Client(
+        organisation_id=organisation_id,
+        first_name="Bench",
+        last_name=str(i),
+        email=f"bench-{i}@example.com",
+        created_at=now,
+        updated_at=now
+    )
+
+
+def before(db, auth: AuthContext, i: int):
+    client = _new_client(auth.organisation_id, i)
+    db.add(client)
+    db.commit()
+    db.refresh(client)
+    db.add(models.AuditLog(
+        organisation_id=auth.organisation_id,
+        actor_type=auth.role,
+        action="CREATE",
+        entity="CLIENT",
+        after={"id": str(client.id), "email": client.email}
+    ))
+    db.commit()
+    return schemas.ClientResponse.model_validate(client)
+
+
+def after(db, auth: AuthContext, i: int):
+    uow = UnitOfWork(db, auth)
+    client = uow.add(_new_client(auth.organisation_id, i))
+    uow.flush()
+    uow.audit("CREATE", "CLIENT", after={"id": str(client.id), "email": client.email})
+    return uow.commit(lambda: schemas.ClientResponse.model_validate(client))
+
+
+def _run(fn, auth: AuthContext, writes: int):
+    timings = []
+    statements = _statements()
+    for i in range(writes):
+        db = SessionLocal()
+        try:
+            start = time.perf_counter()
+            fn(db, auth, i)
+            timings.append((time.perf_counter() - start) * 1000)
+        finally:
+            db.close()
+    timings.sort()
+    return timings, (_statements() - statements) / writes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--writes", type=int, default=200)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    organisation = models.Organisation(name=f"benchmark-{uuid.uuid4().hex[:8]}")
+    db.add(organisation)
+    db.commit()
+    auth = AuthContext(
+        auth_user_id="benchmark",
+        user_id="benchmark",
+        organisation_id=str(organisation.id),
+        role="OWNER",
+        email="benchmark@example.com",
+        name="Benchmark"
+    )
+
+    try:
+        for name, fn in (("before (commit, refresh, commit)", before), ("after (unit of work)", after)):
+            timings, statements = _run(fn, auth, args.writes)
+            p95 = timings[int(len(timings) * 0.95) - 1]
+            print(
+                f"{name:<34} mean {statistics.mean(timings):7.2f} ms  "
+                f"p50 {statistics.median(timings):7.2f} ms  p95 {p95:7.2f} ms  "
+                f"{statements:4.1f} statements/write"
+            )
+    finally:
+        db.delete(organisation)
+        db.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
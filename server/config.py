@@ -7,6 +7,11 @@ class Settings(BaseSettings):
     PORT: int = 3001
     ENVIRONMENT: str = "development"
 
+    # Connection pool (0 = NullPool, a fresh connection per session)
+    DB_POOL_SIZE: int = 0
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0
+
     # Supabase configuration
     SUPABASE_URL: Optional[str] = None
     SUPABASE_ANON_KEY: Optional[str] = None
@@ -17,6 +22,80 @@ class Settings(BaseSettings):
     INVITATION_EXPIRY_HOURS: int = 72
     INVITATION_BASE_URL: str = "http://localhost:8080/accept-invite"
 
+    # Metrics settings
+    METRICS_ENABLED: bool = True
+    # Shared directory for multi-worker aggregation (unset = single process)
+    METRICS_MULTIPROC_DIR: Optional[str] = None
+    METRICS_FLUSH_INTERVAL_SECONDS: float = 5.0
+
+    # Readiness probe settings
+    READINESS_CHECK_INTERVAL_SECONDS: float = 5.0
+
+    # Response compression settings
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    # Bodies at least this large are compressed in the thread pool
+    COMPRESSION_THREADPOOL_MIN_SIZE: int = 65536
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+
+    # Response cache settings (none, redis, or memory for a single worker)
+    CACHE_BACKEND: str = "none"
+    CACHE_REDIS_URL: Optional[str] = None
+    CACHE_TTL_SECONDS: float = 60.0
+    CACHE_MAX_ENTRIES: int = 10000
+    # Reports are keyed by day and invalidated by writes, so they can live longer
+    REPORT_CACHE_TTL_SECONDS: float = 3600.0
+
+    # Organisation record cache (per process; TTL bounds cross-worker staleness)
+    ORG_CACHE_TTL_SECONDS: float = 30.0
+    ORG_CACHE_MAX_ENTRIES: int = 10000
+
+    # Audit sink settings (transactional or async)
+    AUDIT_SINK_MODE: str = "transactional"
+    AUDIT_SINK_BATCH_SIZE: int = 500
+    AUDIT_SINK_FLUSH_INTERVAL_SECONDS: float = 1.0
+    AUDIT_SINK_QUEUE_SIZE: int = 10000
+    # Failed batches are retried with exponential backoff this many times
+    AUDIT_SINK_MAX_RETRIES: int = 5
+
+    # Audit log partition maintenance (retention 0 = keep forever)
+    AUDIT_PARTITION_PREMAKE_MONTHS: int = 3
+    AUDIT_RETENTION_MONTHS: int = 0
+    AUDIT_RETENTION_ACTION: str = "archive"
+    AUDIT_ARCHIVE_SCHEMA: str = "audit_archive"
+
+    # Agreement event outbox relay and server-sent event streams
+    OUTBOX_BATCH_SIZE: int = 500
+    OUTBOX_POLL_INTERVAL_SECONDS: float = 1.0
+    SSE_QUEUE_SIZE: int = 100
+    SSE_KEEPALIVE_SECONDS: float = 15.0
+
+    # Customer portal access tokens: lifetime, verification cache and how
+    # often coalesced last_used_at updates are written
+    ACCESS_TOKEN_TTL_DAYS: int = 30
+    ACCESS_TOKEN_CACHE_TTL_SECONDS: float = 60.0
+    ACCESS_TOKEN_TOUCH_INTERVAL_SECONDS: float = 60.0
+
+    # Idempotency-Key responses are replayed for this long
+    IDEMPOTENCY_KEY_TTL_SECONDS: int = 86400
+
+    # Bulk CSV / NDJSON imports: rows per validate-insert-commit chunk
+    IMPORT_CHUNK_SIZE: int = 1000
+
+    # Instalment schedules: business-day roll (none, following, preceding,
+    # modifiedfollowing, modifiedpreceding) and a file of YYYY-MM-DD holidays
+    SCHEDULE_BUSINESS_DAY_ROLL: str = "none"
+    SCHEDULE_HOLIDAYS_FILE: Optional[str] = None
+
+    # Instalment status sweep (interval 0 = no in-process scheduler)
+    INSTALMENT_SWEEP_INTERVAL_SECONDS: float = 0.0
+    INSTALMENT_SWEEP_BATCH_SIZE: int = 5000
+    INSTALMENT_GRACE_DAYS: int = 0
+    # Arrears rules for ACTIVE -> DEFAULTED (0 disables a rule)
+    AGREEMENT_DEFAULT_MISSED_INSTALMENTS: int = 2
+    AGREEMENT_DEFAULT_DAYS_PAST_DUE: int = 60
+
     class Config:
         print("Config class")
         env_file = ".env"
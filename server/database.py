@@ -3,6 +3,7 @@ from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import NullPool
 from config import settings
+from services.metrics import instrument_engine
 
 # Supabase Postgres requires SSL in production. Normalize URL and enforce SSL.
 def _normalize_database_url(url: str) -> str:
@@ -20,8 +21,21 @@ connect_args = {}
 if normalized_url and "supabase.co" in normalized_url:
     connect_args = {"sslmode": "require"}
 
-# Use NullPool for serverless — no point maintaining a pool in a short-lived function
-engine = create_engine(normalized_url, connect_args=connect_args, poolclass=NullPool)
+# Use NullPool for serverless — no point maintaining a pool in a short-lived function.
+# Long-running deployments can opt into a QueuePool by setting DB_POOL_SIZE > 0.
+if settings.DB_POOL_SIZE > 0:
+    engine = create_engine(
+        normalized_url,
+        connect_args=connect_args,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        pool_pre_ping=True
+    )
+else:
+    engine = create_engine(normalized_url, connect_args=connect_args, poolclass=NullPool)
+if settings.METRICS_ENABLED:
+    instrument_engine(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -1,11 +1,53 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from routers import health, clients, agreements, dashboard, policies, auth, memberships, organisations
+from config import settings
+from middleware.compression import CompressionMiddleware
+from middleware.metrics import MetricsMiddleware
+from routers import health, clients, agreements, dashboard, policies, auth, memberships, organisations, audit_logs, reports, events, proposals
+from services import metrics
+from services.access_tokens import access_token_verifier
+from services.audit_sink import audit_sink
+from services.instalment_status import instalment_scheduler
+from services.outbox import outbox_listener, outbox_relay
+from services.readiness import database_probe
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Background workers are started here and drained on shutdown
+    metrics.start_multiprocess_writer(
+        settings.METRICS_MULTIPROC_DIR, settings.METRICS_FLUSH_INTERVAL_SECONDS
+    )
+    database_probe.start()
+    audit_sink.start()
+    outbox_listener.start()
+    outbox_relay.start()
+    access_token_verifier.start()
+    instalment_scheduler.start()
+    try:
+        yield
+    finally:
+        await instalment_scheduler.stop()
+        # Writes pending last_used_at values
+        await access_token_verifier.stop()
+        await outbox_relay.stop()
+        await outbox_listener.stop()
+        # Drain queued audit events before the process exits
+        await asyncio.to_thread(audit_sink.stop)
+        await database_probe.stop()
+        metrics.stop_multiprocess_writer()
+
 
 app = FastAPI(
     title="LendInsure API",
     description="Insurance financing platform API",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # TEMP CORS for first run; tighten later
@@ -17,6 +59,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+        threadpool_min_size=settings.COMPRESSION_THREADPOOL_MIN_SIZE,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+    )
+
+# Added last so it wraps every other middleware and times the full request
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 @app.get("/")
 def root():
     return {"ok": True, "service": "lendinsure-api"}
@@ -30,3 +85,7 @@ app.include_router(dashboard.router)
 app.include_router(policies.router)
 app.include_router(memberships.router)
 app.include_router(organisations.router)
+app.include_router(audit_logs.router)
+app.include_router(reports.router)
+app.include_router(events.router)
+app.include_router(proposals.router)
@@ -14,7 +14,8 @@ from jose import jwt, JWTError
 
 from config import settings
 from database import get_db
-from models import User, Membership, MembershipStatusEnum
+from models import User, Membership, MembershipStatusEnum, OrganisationStatusEnum
+from services.org_cache import organisation_cache
 
 
 @dataclass
@@ -110,6 +111,24 @@ def _get_membership_from_auth_user_id(db: Session, auth_user_id: str) -> tuple[U
     return user, membership
 
 
+def _require_active_organisation(db: Session, context: AuthContext) -> AuthContext:
+    """
+    Reject requests for SUSPENDED organisations.
+
+    Served from the organisation cache, so this normally costs no query.
+
+    Raises:
+        HTTPException: 403 if the organisation is suspended
+    """
+    organisation = organisation_cache.get(db, context.organisation_id)
+    if organisation is not None and organisation.status == OrganisationStatusEnum.SUSPENDED:
+        raise HTTPException(
+            status_code=403,
+            detail="Organisation is suspended"
+        )
+    return context
+
+
 async def get_auth_context(
     x_user_id: Optional[str] = Header(None),
     x_org_id: Optional[str] = Header(None),
@@ -134,7 +153,7 @@ async def get_auth_context(
         AuthContext with user and organisation information
 
     Raises:
-        HTTPException: If authentication fails
+        HTTPException: If authentication fails or the organisation is suspended
     """
     # PRIORITY: Always prefer JWT if provided
     # X-* headers only work in dev mode when EXPLICITLY provided (for curl/API testing)
@@ -144,7 +163,7 @@ async def get_auth_context(
     elif settings.ENVIRONMENT == "development" and x_user_id and x_org_id:
         # Development mode: allow X-* headers for explicit API testing only
         # This is for curl/Postman testing, NOT for frontend fallback
-        return AuthContext(
+        return _require_active_organisation(db, AuthContext(
             auth_user_id=x_user_id,
             user_id=x_user_id,
             organisation_id=x_org_id,
@@ -152,7 +171,7 @@ async def get_auth_context(
             email="dev@example.com",
             name="Dev User",
             access_token=None
-        )
+        ))
 
     # All other cases: require JWT (production mode behavior)
     if not authorization or not authorization.startswith("Bearer "):
@@ -176,7 +195,7 @@ async def get_auth_context(
     # Look up user and membership
     user, membership = _get_membership_from_auth_user_id(db, auth_user_id)
 
-    return AuthContext(
+    return _require_active_organisation(db, AuthContext(
         auth_user_id=str(auth_user_id),
         user_id=str(user.id),
         organisation_id=str(membership.organisation_id),
@@ -184,7 +203,7 @@ async def get_auth_context(
         email=user.email,
         name=user.name,
         access_token=token
-    )
+    ))
 
 
 async def get_optional_auth_context(
@@ -0,0 +1,189 @@
+"""
+Response compression middleware.
+
+Negotiates brotli (when the optional `brotli` package is installed) or gzip
+from `Accept-Encoding` and compresses complete, non-streaming responses above
+a minimum size. Large bodies are compressed in the thread pool so the event
+loop keeps serving other requests.
+
+Bypassed:
+- streaming responses (more than one body chunk) and server-sent events
+- responses that already carry a Content-Encoding
+- 204 / 304 responses and non-text content types
+"""
+
+import gzip
+
+import anyio
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; fall back to gzip only
+    brotli = None
+
+
+_COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "application/x-ndjson",
+    "image/svg+xml",
+)
+
+
+def _accepted_encodings(header: str) -> dict:
+    """Parse Accept-Encoding into {coding: q}."""
+    accepted = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    return accepted
+
+
+def choose_encoding(header: str):
+    """
+    Pick the supported coding the client prefers (highest q, `br` on a tie)
+    for an Accept-Encoding header, or None.
+    """
+    accepted = _accepted_encodings(header)
+    wildcard = accepted.get("*", 0.0)
+    # In preference order, so max() keeps br on equal q
+    supported = ("br", "gzip") if brotli is not None else ("gzip",)
+    best = max(supported, key=lambda coding: accepted.get(coding, wildcard))
+    return best if accepted.get(best, wildcard) > 0 else None
+
+
+class CompressionMiddleware:
+    """
+    Pure ASGI compression middleware.
+
+    Args:
+        app: The wrapped ASGI app
+        minimum_size: Bodies smaller than this are sent uncompressed
+        threadpool_min_size: Bodies at least this large are compressed off the event loop
+        gzip_level: gzip compression level (1-9)
+        brotli_quality: brotli quality (0-11)
+    """
+
+    def __init__(
+        self,
+        app,
+        minimum_size: int = 1024,
+        threadpool_min_size: int = 65536,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.threadpool_min_size = threadpool_min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept = ""
+        for key, value in scope["headers"]:
+            if key == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept) if accept else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                passthrough = not self._eligible(message)
+                if passthrough:
+                    await send(message)
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            if message.get("more_body", False):
+                # Streaming (NDJSON exports, chunked downloads): never buffer
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            headers = _MutableHeaders(start_message)
+            headers.add_vary("Accept-Encoding")
+            if len(body) < self.minimum_size:
+                await send(start_message)
+                await send(message)
+                return
+
+            if len(body) >= self.threadpool_min_size:
+                compressed = await anyio.to_thread.run_sync(self._compress, encoding, body)
+            else:
+                compressed = self._compress(encoding, body)
+
+            headers.set("content-encoding", encoding)
+            headers.set("content-length", str(len(compressed)))
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _eligible(self, message) -> bool:
+        if message["status"] in (204, 304) or message["status"] < 200:
+            return False
+        content_type = ""
+        for key, value in message.get("headers", []):
+            if key == b"content-encoding":
+                return False
+            if key == b"content-type":
+                content_type = value.decode("latin-1").lower()
+        if content_type.startswith("text/event-stream"):
+            return False
+        return content_type.startswith(_COMPRESSIBLE_TYPES)
+
+    def _compress(self, encoding: str, body: bytes) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+
+class _MutableHeaders:
+    """Minimal in-place header editor for an http.response.start message."""
+
+    def __init__(self, message):
+        self.message = message
+        self.message["headers"] = list(message.get("headers", []))
+
+    def set(self, name: str, value: str) -> None:
+        key = name.lower().encode("latin-1")
+        headers = [(k, v) for k, v in self.message["headers"] if k != key]
+        headers.append((key, value.encode("latin-1")))
+        self.message["headers"] = headers
+
+    def add_vary(self, value: str) -> None:
+        for i, (k, v) in enumerate(self.message["headers"]):
+            if k == b"vary":
+                existing = v.decode("latin-1")
+                if value.lower() not in existing.lower():
+                    self.message["headers"][i] = (k, f"{existing}, {value}".encode("latin-1"))
+                return
+        self.message["headers"].append((b"vary", value.encode("latin-1")))
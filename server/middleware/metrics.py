@@ -0,0 +1,61 @@
+"""
+Request metrics middleware.
+
+Records per-route latency, response counts by status, in-flight requests and
+unhandled exceptions into the in-process registry in `services.metrics`.
+
+Routes are labelled by their template (e.g. `/api/broker/clients/{id}`) rather
+than the raw path so label cardinality stays bounded; requests that match no
+route are grouped under `unmatched`.
+"""
+
+from time import perf_counter
+
+from services.metrics import (
+    HTTP_EXCEPTIONS,
+    HTTP_REQUEST_DURATION,
+    HTTP_REQUESTS,
+    HTTP_REQUESTS_IN_FLIGHT,
+)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware so streaming responses are not buffered."""
+
+    def __init__(self, app):
+        self.app = app
+        self._in_flight = HTTP_REQUESTS_IN_FLIGHT._default
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_flight = self._in_flight
+        in_flight.value += 1
+        start = perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as exc:
+            HTTP_EXCEPTIONS.labels(_route_label(scope), type(exc).__name__).inc()
+            raise
+        finally:
+            elapsed = perf_counter() - start
+            in_flight.value -= 1
+            method = scope["method"]
+            route = _route_label(scope)
+            HTTP_REQUEST_DURATION.labels(method, route).observe(elapsed)
+            HTTP_REQUESTS.labels(method, route, str(status_code)).inc()
+
+
+def _route_label(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
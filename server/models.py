@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Numeric, DateTime, ForeignKey, Enum, JSON, Index, UUID
+from sqlalchemy import Column, String, Integer, Numeric, DateTime, ForeignKey, Enum, JSON, Index, UniqueConstraint, UUID, DDL, event
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -169,7 +169,7 @@ class AgreementAccessToken(Base):
 
     __table_args__ = (
         Index('idx_agreement_access_tokens_agreement_id', 'agreement_id'),
-        Index('idx_agreement_access_tokens_token_hash', 'token_hash'),
+        # token_hash lookups use the unique constraint's index
     )
 
 class Client(Base):
@@ -195,6 +195,8 @@ class Client(Base):
     __table_args__ = (
         Index('idx_clients_organisation_id', 'organisation_id'),
         Index('idx_clients_email', 'email'),
+        # Case-insensitive email lookups within an organisation (imports)
+        Index('idx_clients_organisation_id_email_lower', organisation_id, func.lower(email)),
     )
 
 class Policy(Base):
@@ -219,6 +221,8 @@ class Policy(Base):
     __table_args__ = (
         Index('idx_policies_organisation_id', 'organisation_id'),
         Index('idx_policies_client_id', 'client_id'),
+        # Policy imports upsert on the insurer's policy number
+        UniqueConstraint('organisation_id', 'policy_number', name='uq_policies_organisation_id_policy_number'),
     )
 
 class Agreement(Base):
@@ -233,6 +237,8 @@ class Agreement(Base):
     term_months = Column(Integer, nullable=False)
     broker_fee_bps = Column(Integer, nullable=False)
     status = Column(Enum(AgreementStatusEnum), default=AgreementStatusEnum.DRAFT)
+    # Bumped by every status transition; clients send it back in If-Match
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     signed_at = Column(DateTime(timezone=True))
     activated_at = Column(DateTime(timezone=True))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -245,14 +251,16 @@ class Agreement(Base):
     # Commented out relationships for tables that don't exist
     # payments = relationship("Payment", back_populates="agreement", cascade="all, delete-orphan")
     # credit_checks = relationship("CreditCheck", back_populates="agreement", cascade="all, delete-orphan")
-    # events = relationship("AgreementEvent", back_populates="agreement", cascade="all, delete-orphan")
+    events = relationship("AgreementEvent", back_populates="agreement", cascade="all, delete-orphan")
     # documents = relationship("AgreementDocument", back_populates="agreement", cascade="all, delete-orphan")
-    # commission_lines = relationship("CommissionLine", back_populates="agreement", cascade="all, delete-orphan")
+    commission_lines = relationship("CommissionLine", back_populates="agreement", cascade="all, delete-orphan")
     
     __table_args__ = (
         Index('idx_agreements_organisation_id', 'organisation_id'),
         Index('idx_agreements_client_id', 'client_id'),
         Index('idx_agreements_status', 'status'),
+        # Incremental batch jobs scan agreements changed since a watermark
+        Index('idx_agreements_updated_at', 'updated_at'),
     )
 
 class Instalment(Base):
@@ -270,7 +278,11 @@ class Instalment(Base):
     agreement = relationship("Agreement", back_populates="instalments")
     # payments = relationship("Payment", back_populates="instalment")  # Table doesn't exist
     
-    __table_args__ = (Index('idx_instalments_agreement_id', 'agreement_id'),)
+    __table_args__ = (
+        Index('idx_instalments_agreement_id', 'agreement_id'),
+        # Serves the status sweep (services/instalment_status.py)
+        Index('idx_instalments_status_due_date', 'status', 'due_date'),
+    )
 
 # Payment model - table doesn't exist in current database
 # class Payment(Base):
@@ -307,20 +319,33 @@ class Instalment(Base):
 #     
 #     __table_args__ = (Index('idx_credit_checks_agreement_id', 'agreement_id'),)
 
-# AgreementEvent model - table doesn't exist in current database
-# class AgreementEvent(Base):
-#     __tablename__ = "agreement_events"
-#     
-#     id = Column(UUID(as_uuid=True), primary_key=True, default=generate_uuid)
-#     agreement_id = Column(UUID(as_uuid=True), ForeignKey("agreements.id", ondelete="CASCADE"), nullable=False)
-#     type = Column(String, nullable=False)
-#     actor_type = Column(String, nullable=False)
-#     meta = Column(JSON)
-#     created_at = Column(DateTime(timezone=True), server_default=func.now())
-#     
-#     agreement = relationship("Agreement", back_populates="events")
-#     
-#     __table_args__ = (Index('idx_agreement_events_agreement_id', 'agreement_id'),)
+class AgreementEvent(Base):
+    """
+    Agreement history and transactional outbox: written in the same
+    transaction as the change, relayed by services/outbox.py.
+    """
+    __tablename__ = "agreement_events"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=generate_uuid)
+    organisation_id = Column(UUID(as_uuid=True), ForeignKey("organisations.id", ondelete="CASCADE"), nullable=False)
+    agreement_id = Column(UUID(as_uuid=True), ForeignKey("agreements.id", ondelete="CASCADE"), nullable=False)
+    type = Column(String, nullable=False)
+    actor_type = Column(String, nullable=False)
+    meta = Column(JSON)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Set when the outbox relay has published the event
+    processed_at = Column(DateTime(timezone=True))
+    
+    agreement = relationship("Agreement", back_populates="events")
+    
+    __table_args__ = (
+        Index('idx_agreement_events_agreement_id', 'agreement_id'),
+        # Only unrelayed events are indexed, so the relay's scan stays small
+        Index(
+            'idx_agreement_events_unprocessed', 'created_at',
+            postgresql_where=processed_at.is_(None)
+        ),
+    )
 
 # AgreementDocument model - table doesn't exist in current database
 # class AgreementDocument(Base):
@@ -336,20 +361,54 @@ class Instalment(Base):
 #     
 #     __table_args__ = (Index('idx_agreement_documents_agreement_id', 'agreement_id'),)
 
-# CommissionLine model - table doesn't exist in current database
-# class CommissionLine(Base):
-#     __tablename__ = "commission_lines"
-#     
-#     id = Column(UUID(as_uuid=True), primary_key=True, default=generate_uuid)
-#     agreement_id = Column(UUID(as_uuid=True), ForeignKey("agreements.id", ondelete="CASCADE"), nullable=False)
-#     type = Column(String, nullable=False)
-#     amount = Column(Numeric(10, 2), nullable=False)
-#     currency = Column(String, default="GBP")
-#     calculated_at = Column(DateTime(timezone=True), server_default=func.now())
-#     
-#     agreement = relationship("Agreement", back_populates="commission_lines")
-#     
-#     __table_args__ = (Index('idx_commission_lines_agreement_id', 'agreement_id'),)
+class CommissionLine(Base):
+    """Broker commission earned on an agreement; written by services/commission.py."""
+    __tablename__ = "commission_lines"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=generate_uuid)
+    organisation_id = Column(UUID(as_uuid=True), ForeignKey("organisations.id", ondelete="CASCADE"), nullable=False)
+    agreement_id = Column(UUID(as_uuid=True), ForeignKey("agreements.id", ondelete="CASCADE"), nullable=False)
+    type = Column(String, nullable=False)
+    amount_pennies = Column(Integer, nullable=False)
+    currency = Column(String, default="GBP", nullable=False)
+    # When the agreement was signed (or activated); commission is reported by this month
+    earned_at = Column(DateTime(timezone=True), nullable=False)
+    calculated_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    agreement = relationship("Agreement", back_populates="commission_lines")
+    
+    __table_args__ = (
+        # One line per agreement and type, so reruns insert nothing twice
+        UniqueConstraint('agreement_id', 'type', name='uq_commission_lines_agreement_id_type'),
+        Index('idx_commission_lines_organisation_id_earned_at', 'organisation_id', 'earned_at'),
+    )
+
+class JobWatermark(Base):
+    """High-water mark of the last incremental run of a batch job."""
+    __tablename__ = "job_watermarks"
+    
+    name = Column(String, primary_key=True)
+    watermark = Column(DateTime(timezone=True), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class IdempotencyKey(Base):
+    """Stored response of a POST sent with an Idempotency-Key header."""
+    __tablename__ = "idempotency_keys"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=generate_uuid)
+    organisation_id = Column(UUID(as_uuid=True), ForeignKey("organisations.id", ondelete="CASCADE"), nullable=False)
+    key = Column(String, nullable=False)
+    # sha256 of the method, path and validated request body
+    fingerprint = Column(String, nullable=False)
+    status_code = Column(Integer)
+    response = Column(JSON)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    
+    __table_args__ = (
+        UniqueConstraint('organisation_id', 'key', name='uq_idempotency_keys_organisation_id_key'),
+        Index('idx_idempotency_keys_expires_at', 'expires_at'),
+    )
 
 class AuditLog(Base):
     __tablename__ = "audit_logs"
@@ -361,15 +420,26 @@ class AuditLog(Base):
     entity = Column(String, nullable=False)
     before = Column(JSON)
     after = Column(JSON)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Partition key, so it is part of the primary key
+    created_at = Column(DateTime(timezone=True), primary_key=True, server_default=func.now())
     
     organisation = relationship("Organisation", back_populates="audit_logs")
     
+    # Range-partitioned by month; see services/audit_partitions.py
     __table_args__ = (
-        Index('idx_audit_logs_organisation_id', 'organisation_id'),
+        # Serves per-org audit trail pages in (created_at, id) keyset order
+        Index('idx_audit_logs_organisation_id_created_at', 'organisation_id', 'created_at', 'id'),
         Index('idx_audit_logs_created_at', 'created_at'),
+        {"postgresql_partition_by": "RANGE (created_at)"},
     )
 
+# Rows outside any monthly partition land here until maintenance moves them
+event.listen(
+    AuditLog.__table__,
+    "after_create",
+    DDL("CREATE TABLE IF NOT EXISTS audit_logs_default PARTITION OF audit_logs DEFAULT")
+)
+
 # Proposal model - table doesn't exist in current database
 # class Proposal(Base):
 #     __tablename__ = "proposals"
@@ -1,81 +1,131 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from sqlalchemy import delete, select
 from sqlalchemy.orm import Session
-from typing import Optional
-from datetime import datetime, timedelta
+from typing import List, Optional
+from datetime import datetime, timezone
 from decimal import Decimal
 import uuid
 from database import get_db
 from middleware.auth import AuthContext, get_auth_context
 from middleware.rbac import require_minimum_role
+from services.conditional import (
+    Preconditions, conditional_response, detail_response, get_preconditions,
+    list_validators, validator_column, version_column, version_etag
+)
+from services.access_tokens import access_token_verifier, issue_token
+from services.agreement_state import (
+    MINIMUM_ROLE, parse_if_match, record_transition, transition, transition_many
+)
+from services.audit_sink import audit_sink
+from services.cache import response_cache
+from services.idempotency import Idempotency, get_idempotency
+from services.outbox import outbox_relay, record_event, record_events
+from services.schedule import schedule_generator
+from services.serialization import (
+    json_response, row_to_dict, rows_to_dicts, schema_columns, sparse_fields
+)
 import models
 import schemas
 import math
 
 router = APIRouter(prefix="/api/broker/agreements", tags=["Broker - Agreements"])
 
-@router.get("")
+@router.get("", response_model=schemas.AgreementListResponse)
 async def list_agreements(
     status: Optional[str] = None,
     client_id: Optional[str] = None,
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
+    fields: Optional[List[str]] = Depends(sparse_fields(schemas.AgreementResponse)),
+    preconditions: Preconditions = Depends(get_preconditions),
     db: Session = Depends(get_db),
     auth: AuthContext = Depends(get_auth_context)
 ):
     # Any authenticated user can list agreements
     require_minimum_role("READ_ONLY")(auth)
 
-    # Always filter by organisation
-    query = db.query(models.Agreement).filter(
-        models.Agreement.organisation_id == auth.organisation_id
-    )
+    def load(preconditions: Preconditions):
+        # Always filter by organisation. Select only the requested
+        # AgreementResponse columns as plain tuples: no ORM instances, no lazy
+        # relationships, and the page serializes straight through orjson.
+        query = db.query(*schema_columns(models.Agreement, schemas.AgreementResponse, fields)).filter(
+            models.Agreement.organisation_id == auth.organisation_id
+        )
 
-    if status:
-        query = query.filter(models.Agreement.status == status)
-    if client_id:
-        query = query.filter(models.Agreement.client_id == client_id)
-    
-    total = query.count()
-    agreements = query.offset((page - 1) * limit).limit(limit).all()
-    
-    return {
-        "data": agreements,
-        "pagination": {
-            "page": page,
-            "limit": limit,
-            "total": total,
-            "total_pages": math.ceil(total / limit)
-        }
-    }
+        if status:
+            query = query.filter(models.Agreement.status == status)
+        if client_id:
+            query = query.filter(models.Agreement.client_id == client_id)
+
+        # One aggregate gives both the total and the list's validators
+        total, last_modified, etag = list_validators(
+            query, models.Agreement, status, client_id, page, limit, fields
+        )
+
+        def build():
+            rows = query.offset((page - 1) * limit).limit(limit).all()
+            return {
+                "data": rows_to_dicts(rows),
+                "pagination": {
+                    "page": page,
+                    "limit": limit,
+                    "total": total,
+                    "total_pages": math.ceil(total / limit)
+                }
+            }
+
+        return conditional_response(preconditions, etag, last_modified, build)
 
-@router.get("/{id}")
+    return response_cache.respond(
+        preconditions, auth.organisation_id, "agreements:list",
+        (status, client_id, page, limit, fields), load
+    )
+
+@router.get("/{id}", response_model=schemas.AgreementResponse)
 async def get_agreement(
     id: str,
+    fields: Optional[List[str]] = Depends(sparse_fields(schemas.AgreementResponse)),
+    preconditions: Preconditions = Depends(get_preconditions),
     db: Session = Depends(get_db),
     auth: AuthContext = Depends(get_auth_context)
 ):
     # Any authenticated user can view an agreement
     require_minimum_role("READ_ONLY")(auth)
 
-    agreement = db.query(models.Agreement).filter(
-        models.Agreement.id == id,
-        models.Agreement.organisation_id == auth.organisation_id
-    ).first()
-    
-    if not agreement:
-        raise HTTPException(status_code=404, detail="Agreement not found")
-    
-    return agreement
+    def load(preconditions: Preconditions):
+        agreement = db.query(
+            *schema_columns(models.Agreement, schemas.AgreementResponse, fields),
+            validator_column(models.Agreement),
+            version_column(models.Agreement)
+        ).filter(
+            models.Agreement.id == id,
+            models.Agreement.organisation_id == auth.organisation_id
+        ).first()
 
-@router.post("", status_code=201)
+        if not agreement:
+            raise HTTPException(status_code=404, detail="Agreement not found")
+
+        return detail_response(preconditions, agreement, fields)
+
+    return response_cache.respond(
+        preconditions, auth.organisation_id, "agreements:detail", (id, fields), load
+    )
+
+@router.post("", status_code=201, response_model=schemas.AgreementResponse)
 async def create_agreement(
     agreement_data: schemas.AgreementCreate,
+    idempotency: Idempotency = Depends(get_idempotency),
     db: Session = Depends(get_db),
     auth: AuthContext = Depends(get_auth_context)
 ):
     # MEMBER+ can create agreements
     require_minimum_role("MEMBER")(auth)
     
+    # Retries with the same Idempotency-Key get the original response
+    replay = idempotency.begin(db, auth.organisation_id, agreement_data)
+    if replay is not None:
+        return replay
+    
     # Verify client and policy
     client = db.query(models.Client).filter(
         models.Client.id == uuid.UUID(agreement_data.client_id),
@@ -97,11 +147,12 @@ async def create_agreement(
     monthly_rate = (apr_bps / 10000) / 12
     monthly_payment = principal * monthly_rate / (1 - pow(1 + monthly_rate, -term_months))
     
-    signed_at = agreement_data.signed_at or datetime.utcnow()
-    activated_at = signed_at + timedelta(days=1)  # Assume activated next day
+    # Instalments run from the given date (or today); the agreement's own
+    # signed_at / activated_at are set by the SIGNED / ACTIVE transitions
+    schedule_start = agreement_data.signed_at or datetime.now(timezone.utc)
     
     # Create agreement with explicit timestamps
-    now = datetime.utcnow()
+    now = datetime.now(timezone.utc)
     agreement = models.Agreement(
         organisation_id=uuid.UUID(auth.organisation_id),
         client_id=uuid.UUID(agreement_data.client_id),
@@ -111,8 +162,6 @@ async def create_agreement(
         term_months=agreement_data.term_months,
         broker_fee_bps=agreement_data.broker_fee_bps,
         status=models.AgreementStatusEnum.DRAFT,
-        signed_at=signed_at,
-        activated_at=activated_at,
         created_at=now,
         updated_at=now
     )
@@ -120,9 +169,8 @@ async def create_agreement(
     db.add(agreement)
     db.flush()
     
-    # Create instalments
-    for i in range(term_months):
-        due_date = signed_at + timedelta(days=i * 30)
+    # Create instalments on month anniversaries of the schedule start
+    for i, due_date in enumerate(schedule_generator.due_dates(schedule_start, term_months)):
         instalment = models.Instalment(
             agreement_id=agreement.id,
             sequence_number=i + 1,
@@ -132,52 +180,188 @@ async def create_agreement(
         )
         db.add(instalment)
     
-    # Note: AgreementEvent model doesn't exist in current database, skipping event creation
+    record_event(
+        db,
+        agreement.organisation_id,
+        agreement.id,
+        "CREATED",
+        auth.role,
+        meta={"status": models.AgreementStatusEnum.DRAFT.value}
+    )
     
     # Audit log
-    audit_log = models.AuditLog(
-        organisation_id=uuid.UUID(auth.organisation_id),
-        actor_type=auth.role,
-        action="CREATE",
-        entity="AGREEMENT",
+    audit_sink.record(
+        db,
+        uuid.UUID(auth.organisation_id),
+        auth.role,
+        "CREATE",
+        "AGREEMENT",
         after={"id": str(agreement.id)}
     )
-    db.add(audit_log)
     
+    # Build the response before committing expires the agreement
+    db.flush()
+    response = idempotency.store(db, schemas.AgreementResponse.model_validate(agreement), 201)
     db.commit()
-    db.refresh(agreement)
+    response_cache.invalidate(auth.organisation_id)
+    outbox_relay.wake()
     
-    return agreement
+    return response
+
+def apply_transition(
+    db: Session,
+    auth: AuthContext,
+    id: str,
+    target: models.AgreementStatusEnum,
+    if_match: Optional[str] = None
+):
+    require_minimum_role(MINIMUM_ROLE[target])(auth)
+    row = transition(db, auth.organisation_id, id, target, parse_if_match(if_match))
+    record_transition(db, row, target, auth.role)
+    agreement = row_to_dict(row)
+    del agreement["from_status"]
+
+    db.commit()
+    response_cache.invalidate(auth.organisation_id)
+    outbox_relay.wake()
+
+    return json_response(agreement, headers={"ETag": version_etag(row.version)})
+
+@router.post("/transitions", response_model=schemas.BulkAgreementTransitionResponse)
+async def transition_agreements(
+    transition_data: schemas.BulkAgreementTransitionRequest,
+    db: Session = Depends(get_db),
+    auth: AuthContext = Depends(get_auth_context)
+):
+    # Same role rules as single transitions
+    target = transition_data.status
+    require_minimum_role(MINIMUM_ROLE[target])(auth)
+
+    ids = list(dict.fromkeys(transition_data.ids))
+    rows, skipped = transition_many(db, auth.organisation_id, ids, target)
+
+    if rows:
+        record_events(db, [
+            {
+                "organisation_id": row.organisation_id,
+                "agreement_id": row.id,
+                "type": "STATUS_CHANGED",
+                "actor_type": auth.role,
+                "meta": {"from": row.from_status.value, "to": target.value},
+            }
+            for row in rows
+        ])
+        audit_sink.record_many(db, [
+            {
+                "organisation_id": row.organisation_id,
+                "actor_type": auth.role,
+                "action": "TRANSITION",
+                "entity": "AGREEMENT",
+                "before": {"id": str(row.id), "status": row.from_status.value},
+                "after": {"id": str(row.id), "status": target.value},
+            }
+            for row in rows
+        ])
+    db.commit()
+    if rows:
+        response_cache.invalidate(auth.organisation_id)
+        outbox_relay.wake()
 
-@router.post("/{id}/propose")
+    return {
+        "status": target,
+        "updated": [str(row.id) for row in rows],
+        "skipped": skipped
+    }
+
+@router.post("/{id}/transitions", response_model=schemas.AgreementResponse)
+async def transition_agreement(
+    id: str,
+    transition_data: schemas.AgreementTransitionRequest,
+    if_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+    auth: AuthContext = Depends(get_auth_context)
+):
+    # MEMBER+ can move agreements along; terminating needs ADMIN+
+    return apply_transition(db, auth, id, transition_data.status, if_match)
+
+@router.post("/{id}/propose", response_model=schemas.AgreementResponse)
 async def propose_agreement(
     id: str,
+    if_match: Optional[str] = Header(None),
     db: Session = Depends(get_db),
     auth: AuthContext = Depends(get_auth_context)
 ):
     # MEMBER+ can propose agreements
+    return apply_transition(db, auth, id, models.AgreementStatusEnum.PROPOSED, if_match)
+
+@router.post("/{id}/access-tokens", status_code=201, response_model=schemas.AccessTokenResponse)
+async def create_access_token(
+    id: str,
+    db: Session = Depends(get_db),
+    auth: AuthContext = Depends(get_auth_context)
+):
+    # MEMBER+ can give a customer portal access to an agreement
     require_minimum_role("MEMBER")(auth)
-    
-    agreement = db.query(models.Agreement).filter(
+
+    agreement_id = db.query(models.Agreement.id).filter(
         models.Agreement.id == id,
-        models.Agreement.organisation_id == auth.organisation_id,
-        models.Agreement.status == models.AgreementStatusEnum.DRAFT
-    ).first()
-    
-    if not agreement:
-        raise HTTPException(
-            status_code=404,
-            detail="Agreement not found or not in DRAFT status"
+        models.Agreement.organisation_id == auth.organisation_id
+    ).scalar()
+    if agreement_id is None:
+        raise HTTPException(status_code=404, detail="Agreement not found")
+
+    token, access_token = issue_token(db, agreement_id)
+    db.flush()
+    audit_sink.record(
+        db,
+        auth.organisation_id,
+        auth.role,
+        "CREATE",
+        "ACCESS_TOKEN",
+        after={"id": str(access_token.id), "agreement_id": str(agreement_id)}
+    )
+    response = {
+        "token": token,
+        "agreement_id": str(agreement_id),
+        "expires_at": access_token.expires_at
+    }
+    db.commit()
+
+    return response
+
+@router.delete("/{id}/access-tokens")
+async def revoke_access_tokens(
+    id: str,
+    db: Session = Depends(get_db),
+    auth: AuthContext = Depends(get_auth_context)
+):
+    # MEMBER+ can revoke an agreement's portal access
+    require_minimum_role("MEMBER")(auth)
+
+    token_hashes = db.execute(
+        delete(models.AgreementAccessToken)
+        .where(
+            models.AgreementAccessToken.agreement_id == id,
+            models.AgreementAccessToken.agreement_id.in_(
+                select(models.Agreement.id).where(models.Agreement.organisation_id == auth.organisation_id)
+            )
+        )
+        .returning(models.AgreementAccessToken.token_hash)
+    ).scalars().all()
+
+    if token_hashes:
+        audit_sink.record(
+            db,
+            auth.organisation_id,
+            auth.role,
+            "REVOKE",
+            "ACCESS_TOKEN",
+            before={"agreement_id": id, "tokens": len(token_hashes)}
         )
-    
-    agreement.status = models.AgreementStatusEnum.PROPOSED
-    
-    # Note: AgreementEvent model doesn't exist in current database, skipping event creation
-    
     db.commit()
-    db.refresh(agreement)
-    
-    return agreement
+    access_token_verifier.invalidate(token_hashes)
+
+    return {"revoked": len(token_hashes)}
 
 @router.delete("/{id}")
 async def delete_agreement(
@@ -217,14 +401,15 @@ async def delete_agreement(
     db.delete(agreement)
     
     # Audit log
-    audit_log = models.AuditLog(
-        organisation_id=auth.organisation_id,
-        actor_type=auth.role,
-        action="DELETE",
-        entity="AGREEMENT",
+    audit_sink.record(
+        db,
+        auth.organisation_id,
+        auth.role,
+        "DELETE",
+        "AGREEMENT",
         before=agreement_data
     )
-    db.add(audit_log)
     db.commit()
+    response_cache.invalidate(auth.organisation_id)
     
     return {"message": "Agreement deleted successfully"}
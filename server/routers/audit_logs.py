@@ -0,0 +1,141 @@
+"""
+Audit trail router.
+
+Endpoints:
+- GET /api/broker/audit-logs: Page through the organisation's audit logs,
+  newest first, or stream every matching row as NDJSON (`format=ndjson`)
+
+Pages use keyset pagination on (created_at, id): each page returns an opaque
+`next_cursor` and the next page starts strictly after it, so deep pages cost
+the same as the first and concurrent inserts never shift rows between pages.
+"""
+
+import base64
+import binascii
+import uuid
+from datetime import datetime
+from typing import Literal, Optional
+
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import Session
+
+from database import SessionLocal, get_db
+from middleware.auth import AuthContext, get_auth_context
+from middleware.rbac import require_admin
+from models import AuditLog
+from schemas import AuditLogListResponse, AuditLogResponse
+from services.serialization import json_response, row_to_dict, rows_to_dicts, schema_columns
+
+router = APIRouter(prefix="/api/broker/audit-logs", tags=["audit-logs"])
+
+# Rows fetched per round trip when streaming NDJSON
+_STREAM_BATCH_SIZE = 1000
+
+
+def encode_cursor(created_at: datetime, id) -> str:
+    raw = orjson.dumps([created_at.isoformat(), str(id)])
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """
+    Raises:
+        HTTPException: 400 if the cursor was not produced by this endpoint
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, id = orjson.loads(raw)
+        return datetime.fromisoformat(created_at), uuid.UUID(id)
+    except (binascii.Error, orjson.JSONDecodeError, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _audit_query(
+    organisation_id: str,
+    entity: Optional[str],
+    action: Optional[str],
+    actor_type: Optional[str],
+    since: Optional[datetime],
+    until: Optional[datetime],
+    cursor: Optional[str],
+):
+    """Filtered, newest-first select served by idx_audit_logs_organisation_id_created_at."""
+    stmt = select(*schema_columns(AuditLog, AuditLogResponse)).where(
+        AuditLog.organisation_id == organisation_id
+    )
+    if entity:
+        stmt = stmt.where(AuditLog.entity == entity)
+    if action:
+        stmt = stmt.where(AuditLog.action == action)
+    if actor_type:
+        stmt = stmt.where(AuditLog.actor_type == actor_type)
+    if since:
+        stmt = stmt.where(AuditLog.created_at >= since)
+    if until:
+        stmt = stmt.where(AuditLog.created_at < until)
+    if cursor:
+        stmt = stmt.where(tuple_(AuditLog.created_at, AuditLog.id) < decode_cursor(cursor))
+    return stmt.order_by(AuditLog.created_at.desc(), AuditLog.id.desc())
+
+
+def _stream_ndjson(stmt):
+    """
+    Yield matching rows as NDJSON in batches from a server-side cursor.
+
+    Uses its own session: the request's `get_db` session is closed before a
+    streaming body is sent.
+    """
+    db = SessionLocal()
+    try:
+        result = db.execute(stmt.execution_options(yield_per=_STREAM_BATCH_SIZE))
+        for rows in result.partitions():
+            yield b"".join(
+                orjson.dumps(row_to_dict(row), option=orjson.OPT_APPEND_NEWLINE)
+                for row in rows
+            )
+    finally:
+        db.close()
+
+
+@router.get("", response_model=AuditLogListResponse)
+async def list_audit_logs(
+    entity: Optional[str] = None,
+    action: Optional[str] = None,
+    actor_type: Optional[str] = None,
+    since: Optional[datetime] = Query(None, description="Only logs created at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only logs created before this time"),
+    cursor: Optional[str] = Query(None, description="`next_cursor` from the previous page"),
+    limit: int = Query(50, ge=1, le=500),
+    format: Literal["json", "ndjson"] = Query(
+        "json", description="`ndjson` streams every matching row and ignores `limit`"
+    ),
+    auth: AuthContext = Depends(get_auth_context),
+    db: Session = Depends(get_db)
+):
+    """
+    List audit logs for the current organisation, newest first.
+
+    Requires ADMIN or OWNER role.
+    """
+    require_admin(auth)
+
+    stmt = _audit_query(auth.organisation_id, entity, action, actor_type, since, until, cursor)
+
+    if format == "ndjson":
+        return StreamingResponse(
+            _stream_ndjson(stmt),
+            media_type="application/x-ndjson",
+            headers={"Content-Disposition": 'attachment; filename="audit-logs.ndjson"'}
+        )
+
+    # One extra row tells us whether another page exists
+    rows = db.execute(stmt.limit(limit + 1)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+
+    return json_response({"data": rows_to_dicts(rows), "next_cursor": next_cursor})
@@ -25,6 +25,7 @@ from schemas import (
     SignupWithOrgRequest, RedeemInvitationRequest, AuthMeResponse,
     UserResponse, OrganisationResponse, MembershipResponse
 )
+from services.org_cache import organisation_cache
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
@@ -98,6 +99,7 @@ async def signup_with_org(
     )
     db.add(membership)
     db.commit()
+    organisation_cache.invalidate(organisation.id)
     db.refresh(organisation)
     db.refresh(user)
     db.refresh(membership)
@@ -276,15 +278,14 @@ async def get_me(
 
     Requires an active membership.
     """
-    # Get fresh data from DB
+    # Get fresh user and membership data from DB; the organisation record is
+    # cached and invalidated whenever it changes
     user = db.query(User).filter(User.id == auth.user_id).first()
     membership = db.query(Membership).filter(
         Membership.user_id == auth.user_id,
         Membership.status == MembershipStatusEnum.ACTIVE
     ).first()
-    organisation = db.query(Organisation).filter(
-        Organisation.id == auth.organisation_id
-    ).first()
+    organisation = organisation_cache.get(db, auth.organisation_id)
 
     if not user or not membership or not organisation:
         raise HTTPException(
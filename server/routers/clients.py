@@ -1,76 +1,144 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import or_
-from typing import Optional
-from datetime import datetime
+from typing import List, Optional
+from datetime import datetime, timezone
 from database import get_db
 from middleware.auth import AuthContext, get_auth_context
 from middleware.rbac import require_minimum_role
+from services.conditional import (
+    Preconditions, conditional_response, detail_response, get_preconditions,
+    list_validators, validator_column
+)
+from services import bulk_import
+from services.audit_sink import audit_sink
+from services.cache import response_cache
+from services.idempotency import Idempotency, get_idempotency
+from services.serialization import rows_to_dicts, schema_columns, sparse_fields
+from services.unit_of_work import UnitOfWork
 import models
 import schemas
 import math
 
 router = APIRouter(prefix="/api/broker/clients", tags=["Broker - Clients"])
 
-@router.get("")
+def _audit_data(client: models.Client) -> dict:
+    """Client fields recorded in UPDATE audit logs."""
+    return {
+        "id": str(client.id),
+        "first_name": client.first_name,
+        "last_name": client.last_name,
+        "email": client.email,
+        "phone": client.phone,
+        "address_line1": client.address_line1,
+        "address_line2": client.address_line2,
+        "city": client.city,
+        "postcode": client.postcode
+    }
+
+@router.get("", response_model=schemas.ClientListResponse)
 async def list_clients(
     search: Optional[str] = None,
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
+    fields: Optional[List[str]] = Depends(sparse_fields(schemas.ClientResponse)),
+    preconditions: Preconditions = Depends(get_preconditions),
     db: Session = Depends(get_db),
     auth: AuthContext = Depends(get_auth_context)
 ):
     # Any authenticated user can list clients
     require_minimum_role("READ_ONLY")(auth)
 
-    # Always filter by organisation
-    query = db.query(models.Client).filter(
-        models.Client.organisation_id == auth.organisation_id
-    )
-    
-    # Search filter
-    if search:
-        query = query.filter(
-            or_(
-                models.Client.first_name.ilike(f"%{search}%"),
-                models.Client.last_name.ilike(f"%{search}%"),
-                models.Client.email.ilike(f"%{search}%")
+    def load(preconditions: Preconditions):
+        # Always filter by organisation, selecting only the requested
+        # ClientResponse columns as plain tuples
+        query = db.query(*schema_columns(models.Client, schemas.ClientResponse, fields)).filter(
+            models.Client.organisation_id == auth.organisation_id
+        )
+
+        # Search filter
+        if search:
+            query = query.filter(
+                or_(
+                    models.Client.first_name.ilike(f"%{search}%"),
+                    models.Client.last_name.ilike(f"%{search}%"),
+                    models.Client.email.ilike(f"%{search}%")
+                )
             )
+
+        # One aggregate gives both the total and the list's validators
+        total, last_modified, etag = list_validators(
+            query, models.Client, search, page, limit, fields
         )
-    
-    total = query.count()
-    clients = query.offset((page - 1) * limit).limit(limit).all()
-    
-    return {
-        "data": clients,
-        "pagination": {
-            "page": page,
-            "limit": limit,
-            "total": total,
-            "total_pages": math.ceil(total / limit)
-        }
-    }
 
-@router.get("/{id}")
+        def build():
+            rows = query.offset((page - 1) * limit).limit(limit).all()
+            return {
+                "data": rows_to_dicts(rows),
+                "pagination": {
+                    "page": page,
+                    "limit": limit,
+                    "total": total,
+                    "total_pages": math.ceil(total / limit)
+                }
+            }
+
+        return conditional_response(preconditions, etag, last_modified, build)
+
+    return response_cache.respond(
+        preconditions, auth.organisation_id, "clients:list",
+        (search, page, limit, fields), load
+    )
+
+@router.post("/import", response_model=schemas.ImportReportResponse)
+def import_clients(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$"),
+    progress: bool = False,
+    db: Session = Depends(get_db),
+    auth: AuthContext = Depends(get_auth_context)
+):
+    # MEMBER+ can import clients. A plain def: FastAPI runs it in the
+    # threadpool, so a long import does not block the event loop.
+    require_minimum_role("MEMBER")(auth)
+
+    fmt = format or bulk_import.detect_format(file.filename, file.content_type)
+    if progress:
+        return StreamingResponse(
+            bulk_import.stream_import(bulk_import.import_clients, auth, file.file, fmt),
+            media_type="application/x-ndjson"
+        )
+    return bulk_import.run_import(bulk_import.import_clients, db, auth, file.file, fmt)
+
+@router.get("/{id}", response_model=schemas.ClientResponse)
 async def get_client(
     id: str,
+    fields: Optional[List[str]] = Depends(sparse_fields(schemas.ClientResponse)),
+    preconditions: Preconditions = Depends(get_preconditions),
     db: Session = Depends(get_db),
     auth: AuthContext = Depends(get_auth_context)
 ):
     # Any authenticated user can view a client
     require_minimum_role("READ_ONLY")(auth)
 
-    query = db.query(models.Client).filter(
-        models.Client.id == id,
-        models.Client.organisation_id == auth.organisation_id
+    def load(preconditions: Preconditions):
+        client = db.query(
+            *schema_columns(models.Client, schemas.ClientResponse, fields),
+            validator_column(models.Client)
+        ).filter(
+            models.Client.id == id,
+            models.Client.organisation_id == auth.organisation_id
+        ).first()
+
+        if not client:
+            raise HTTPException(status_code=404, detail="Client not found")
+
+        return detail_response(preconditions, client, fields)
+
+    return response_cache.respond(
+        preconditions, auth.organisation_id, "clients:detail", (id, fields), load
     )
-    
-    client = query.first()
-    
-    if not client:
-        raise HTTPException(status_code=404, detail="Client not found")
-    
-    return client
 
 @router.put("/{id}")
 async def update_client(
@@ -92,17 +160,7 @@ async def update_client(
         raise HTTPException(status_code=404, detail="Client not found")
     
     # Store original data for audit log
-    original_data = {
-        "id": str(client.id),
-        "first_name": client.first_name,
-        "last_name": client.last_name,
-        "email": client.email,
-        "phone": client.phone,
-        "address_line1": client.address_line1,
-        "address_line2": client.address_line2,
-        "city": client.city,
-        "postcode": client.postcode
-    }
+    original_data = _audit_data(client)
     
     # Update only provided fields
     update_data = client_data.model_dump(exclude_unset=True)
@@ -110,34 +168,13 @@ async def update_client(
         setattr(client, field, value)
     
     # Update timestamp
-    client.updated_at = datetime.utcnow()
+    client.updated_at = datetime.now(timezone.utc)
     
-    db.commit()
-    db.refresh(client)
+    # The update and its audit record commit together
+    uow = UnitOfWork(db, auth)
+    uow.audit("UPDATE", "CLIENT", before=original_data, after=_audit_data(client))
     
-    # Audit log
-    audit_log = models.AuditLog(
-        organisation_id=auth.organisation_id,
-        actor_type=auth.role,
-        action="UPDATE",
-        entity="CLIENT",
-        before=original_data,
-        after={
-            "id": str(client.id),
-            "first_name": client.first_name,
-            "last_name": client.last_name,
-            "email": client.email,
-            "phone": client.phone,
-            "address_line1": client.address_line1,
-            "address_line2": client.address_line2,
-            "city": client.city,
-            "postcode": client.postcode
-        }
-    )
-    db.add(audit_log)
-    db.commit()
-    
-    return schemas.ClientResponse.model_validate(client)
+    return uow.commit(lambda: schemas.ClientResponse.model_validate(client))
 
 @router.delete("/{id}")
 async def delete_client(
@@ -181,34 +218,36 @@ async def delete_client(
     db.delete(client)
     
     # Audit log
-    audit_log = models.AuditLog(
-        organisation_id=auth.organisation_id,
-        actor_type=auth.role,
-        action="DELETE",
-        entity="CLIENT",
+    audit_sink.record(
+        db,
+        auth.organisation_id,
+        auth.role,
+        "DELETE",
+        "CLIENT",
         before=client_data
     )
-    db.add(audit_log)
     db.commit()
+    response_cache.invalidate(auth.organisation_id)
     
     return {"message": "Client deleted successfully"}
 
-@router.post("", status_code=201)
+@router.post("", status_code=201, response_model=schemas.ClientResponse)
 async def create_client(
     client_data: schemas.ClientCreate,
+    idempotency: Idempotency = Depends(get_idempotency),
     db: Session = Depends(get_db),
     auth: AuthContext = Depends(get_auth_context)
 ):
     # MEMBER+ can create clients
     require_minimum_role("MEMBER")(auth)
     
-    print("=== DEBUGGING CLIENT CREATION ===")
-    print("1. Incoming client_data:", client_data)
-    print("2. client_data.model_dump():", client_data.model_dump())
-    print("3. auth.organisation_id:", auth.organisation_id)
-
+    # Retries with the same Idempotency-Key get the original response
+    replay = idempotency.begin(db, auth.organisation_id, client_data)
+    if replay is not None:
+        return replay
+    
     # Create client object with explicit timestamp
-    now = datetime.utcnow()
+    now = datetime.now(timezone.utc)
     
     client = models.Client(
         organisation_id=auth.organisation_id,
@@ -216,23 +255,12 @@ async def create_client(
         updated_at=now,
         **client_data.model_dump()
     )
-
-    print("4. Created client object:", client)
-    print("5. Client attributes:", client.__dict__)
-    
-    db.add(client)
-    db.commit()
-    db.refresh(client)
     
-    # Audit log
-    audit_log = models.AuditLog(
-        organisation_id=auth.organisation_id,
-        actor_type=auth.role,
-        action="CREATE",
-        entity="CLIENT",
-        after={"id": str(client.id), "email": client.email}
-    )
-    db.add(audit_log)
-    db.commit()
+    # Flush once to assign the client's id, then commit it together with
+    # its audit record
+    uow = UnitOfWork(db, auth)
+    uow.add(client)
+    uow.flush()
+    uow.audit("CREATE", "CLIENT", after={"id": str(client.id), "email": client.email})
     
-    return client
+    return uow.commit(lambda: idempotency.store(db, schemas.ClientResponse.model_validate(client), 201))
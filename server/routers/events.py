@@ -0,0 +1,58 @@
+"""
+Agreement event stream router.
+
+Endpoints:
+- GET /api/broker/events/stream: Server-sent events for the organisation's
+  agreements (`CREATED`, `STATUS_CHANGED`, ...) as the outbox relays them
+
+Each message carries the event id, its type as the SSE `event` name, and the
+event as JSON `data`. A comment line is sent every SSE_KEEPALIVE_SECONDS so
+proxies keep idle streams open.
+"""
+
+import asyncio
+
+import orjson
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+
+from config import settings
+from middleware.auth import AuthContext, get_auth_context
+from middleware.rbac import require_role
+from services.outbox import event_broadcaster
+
+router = APIRouter(prefix="/api/broker/events", tags=["Broker - Events"])
+
+
+def format_event(event: dict) -> bytes:
+    return (
+        f"id: {event['id']}\nevent: {event['type']}\ndata: ".encode()
+        + orjson.dumps(event)
+        + b"\n\n"
+    )
+
+
+@router.get("/stream")
+async def stream_events(auth: AuthContext = Depends(get_auth_context)):
+    """Stream the current organisation's agreement events."""
+    require_role("OWNER", "ADMIN", "MEMBER", "READ_ONLY")(auth)
+    organisation_id = auth.organisation_id
+
+    async def stream():
+        queue = event_broadcaster.open(organisation_id)
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), settings.SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                yield format_event(event)
+        finally:
+            event_broadcaster.close(organisation_id, queue)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
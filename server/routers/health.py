@@ -1,22 +1,42 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from sqlalchemy import text
-from database import get_db
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse, PlainTextResponse
+from config import settings
 from datetime import datetime
+from services import metrics
+from services.readiness import database_probe
 
 router = APIRouter(tags=["System"])
 
 @router.get("/health")
-async def health_check(db: Session = Depends(get_db)):
-    db_status = "connected"
-    
-    try:
-        db.execute(text("SELECT 1"))
-    except Exception:
-        db_status = "disconnected"
-    
+async def health_check():
+    # Served from the cached readiness state; never touches the database
     return {
-        "ok": db_status == "connected",
+        "ok": database_probe.ready,
         "ts": datetime.utcnow().isoformat(),
-        "database": db_status
-    }
\ No newline at end of file
+        "database": "connected" if database_probe.ok else "disconnected"
+    }
+
+@router.get("/livez")
+async def liveness_check():
+    """Liveness probe: the process is up and serving requests. No DB access."""
+    return {"ok": True, "ts": datetime.utcnow().isoformat()}
+
+@router.get("/readyz")
+async def readiness_check():
+    """
+    Readiness probe backed by the cached database status.
+
+    Returns 503 until the first background probe succeeds, when the last probe
+    failed, or when probes have stopped updating.
+    """
+    report = database_probe.report()
+    report["ts"] = datetime.utcnow().isoformat()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def get_metrics():
+    """Prometheus scrape endpoint, aggregated across workers in multiprocess mode."""
+    return PlainTextResponse(
+        metrics.generate_latest(settings.METRICS_MULTIPROC_DIR),
+        media_type=metrics.CONTENT_TYPE
+    )
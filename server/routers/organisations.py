@@ -14,35 +14,42 @@ from middleware.auth import AuthContext, get_auth_context
 from middleware.rbac import require_admin
 from models import Organisation
 from schemas import OrganisationResponse, OrganisationUpdate
+from services.cache import response_cache
+from services.conditional import (
+    Preconditions, conditional_response, get_preconditions, make_etag
+)
+from services.org_cache import organisation_cache
 
 router = APIRouter(prefix="/api/broker/organisation", tags=["organisation"])
 
 
 @router.get("", response_model=OrganisationResponse)
 async def get_organisation(
+    preconditions: Preconditions = Depends(get_preconditions),
     auth: AuthContext = Depends(get_auth_context),
     db: Session = Depends(get_db)
 ):
     """
     Get the current user's organisation.
 
-    Any authenticated member can view the organisation.
+    Any authenticated member can view the organisation. Supports conditional
+    GET via ETag / Last-Modified derived from `updated_at`, served from the
+    response cache until the organisation is next written.
     """
-    organisation = db.query(Organisation).filter(
-        Organisation.id == auth.organisation_id
-    ).first()
+    def load(preconditions: Preconditions):
+        organisation = organisation_cache.get(db, auth.organisation_id)
 
-    if not organisation:
-        raise HTTPException(status_code=404, detail="Organisation not found")
+        if not organisation:
+            raise HTTPException(status_code=404, detail="Organisation not found")
 
-    return OrganisationResponse(
-        id=str(organisation.id),
-        name=organisation.name,
-        org_type=organisation.org_type,
-        status=organisation.status,
-        created_at=organisation.created_at,
-        updated_at=organisation.updated_at
-    )
+        return conditional_response(
+            preconditions,
+            make_etag(organisation.id, organisation.updated_at),
+            organisation.updated_at,
+            organisation.model_dump
+        )
+
+    return response_cache.respond(preconditions, auth.organisation_id, "organisation", (), load)
 
 
 @router.put("", response_model=OrganisationResponse)
@@ -70,6 +77,8 @@ async def update_organisation(
         organisation.name = update.name
 
     db.commit()
+    organisation_cache.invalidate(auth.organisation_id)
+    response_cache.invalidate(auth.organisation_id)
     db.refresh(organisation)
 
     return OrganisationResponse(
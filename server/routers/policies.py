@@ -1,23 +1,41 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from datetime import datetime
+from typing import List, Optional
+from datetime import datetime, timezone
 from database import get_db
 from middleware.auth import AuthContext, get_auth_context
 from middleware.rbac import require_minimum_role
+from services.conditional import (
+    Preconditions, conditional_response, detail_response, get_preconditions,
+    list_validators, validator_column
+)
+from services import bulk_import
+from services.cache import response_cache
+from services.idempotency import Idempotency, get_idempotency
+from services.serialization import rows_to_dicts, schema_columns, sparse_fields
+from services.unit_of_work import UnitOfWork
 import models
 import schemas
 
 router = APIRouter(prefix="/api/broker/policies", tags=["Broker - Policies"])
 
-@router.post("", status_code=201)
+@router.post("", status_code=201, response_model=schemas.PolicyResponse)
 async def create_policy(
     policy_data: schemas.PolicyCreate,
+    idempotency: Idempotency = Depends(get_idempotency),
     db: Session = Depends(get_db),
     auth: AuthContext = Depends(get_auth_context)
 ):
     # MEMBER+ can create policies
     require_minimum_role("MEMBER")(auth)
     
+    # Retries with the same Idempotency-Key get the original response
+    replay = idempotency.begin(db, auth.organisation_id, policy_data)
+    if replay is not None:
+        return replay
+    
     # Verify client belongs to organisation
     client = db.query(models.Client).filter(
         models.Client.id == policy_data.client_id,
@@ -28,7 +46,7 @@ async def create_policy(
         raise HTTPException(status_code=404, detail="Client not found")
     
     # Create policy with explicit timestamps
-    now = datetime.utcnow()
+    now = datetime.now(timezone.utc)
     
     policy = models.Policy(
         organisation_id=auth.organisation_id,
@@ -37,55 +55,92 @@ async def create_policy(
         **policy_data.model_dump()
     )
     
-    db.add(policy)
-    db.commit()
-    db.refresh(policy)
-    
-    # Audit log
-    audit_log = models.AuditLog(
-        organisation_id=auth.organisation_id,
-        actor_type=auth.role,
-        action="CREATE",
-        entity="POLICY",
-        after={"id": str(policy.id), "policy_number": policy.policy_number}
-    )
-    db.add(audit_log)
-    db.commit()
+    # Flush once to assign the policy's id, then commit it together with
+    # its audit record
+    uow = UnitOfWork(db, auth)
+    uow.add(policy)
+    try:
+        uow.flush()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="A policy with this policy number already exists")
+    uow.audit("CREATE", "POLICY", after={"id": str(policy.id), "policy_number": policy.policy_number})
     
-    return schemas.PolicyResponse.model_validate(policy)
+    return uow.commit(lambda: idempotency.store(db, schemas.PolicyResponse.model_validate(policy), 201))
 
-@router.get("")
+@router.post("/import", response_model=schemas.ImportReportResponse)
+def import_policies(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$"),
+    progress: bool = False,
+    db: Session = Depends(get_db),
+    auth: AuthContext = Depends(get_auth_context)
+):
+    # MEMBER+ can import policies; runs in the threadpool like client imports
+    require_minimum_role("MEMBER")(auth)
+
+    fmt = format or bulk_import.detect_format(file.filename, file.content_type)
+    if progress:
+        return StreamingResponse(
+            bulk_import.stream_import(bulk_import.import_policies, auth, file.file, fmt),
+            media_type="application/x-ndjson"
+        )
+    return bulk_import.run_import(bulk_import.import_policies, db, auth, file.file, fmt)
+
+@router.get("", response_model=List[schemas.PolicyResponse])
 async def list_policies(
     skip: int = 0,
     limit: int = 100,
+    fields: Optional[List[str]] = Depends(sparse_fields(schemas.PolicyResponse)),
+    preconditions: Preconditions = Depends(get_preconditions),
     db: Session = Depends(get_db),
     auth: AuthContext = Depends(get_auth_context)
 ):
     # Any authenticated user can list policies
     require_minimum_role("READ_ONLY")(auth)
 
-    # Always filter by organisation
-    policies = db.query(models.Policy).filter(
-        models.Policy.organisation_id == auth.organisation_id
-    ).offset(skip).limit(limit).all()
-    
-    return policies
+    def load(preconditions: Preconditions):
+        # Always filter by organisation; the requested PolicyResponse column
+        # tuples serialize straight through orjson without touching ORM instances
+        query = db.query(*schema_columns(models.Policy, schemas.PolicyResponse, fields)).filter(
+            models.Policy.organisation_id == auth.organisation_id
+        )
+        _, last_modified, etag = list_validators(query, models.Policy, skip, limit, fields)
 
-@router.get("/{id}")
+        return conditional_response(
+            preconditions, etag, last_modified,
+            lambda: rows_to_dicts(query.offset(skip).limit(limit).all())
+        )
+
+    return response_cache.respond(
+        preconditions, auth.organisation_id, "policies:list", (skip, limit, fields), load
+    )
+
+@router.get("/{id}", response_model=schemas.PolicyResponse)
 async def get_policy(
     id: str,
+    fields: Optional[List[str]] = Depends(sparse_fields(schemas.PolicyResponse)),
+    preconditions: Preconditions = Depends(get_preconditions),
     db: Session = Depends(get_db),
     auth: AuthContext = Depends(get_auth_context)
 ):
     # Any authenticated user can view a policy
     require_minimum_role("READ_ONLY")(auth)
 
-    policy = db.query(models.Policy).filter(
-        models.Policy.id == id,
-        models.Policy.organisation_id == auth.organisation_id
-    ).first()
-    
-    if not policy:
-        raise HTTPException(status_code=404, detail="Policy not found")
-    
-    return policy
+    def load(preconditions: Preconditions):
+        policy = db.query(
+            *schema_columns(models.Policy, schemas.PolicyResponse, fields),
+            validator_column(models.Policy)
+        ).filter(
+            models.Policy.id == id,
+            models.Policy.organisation_id == auth.organisation_id
+        ).first()
+
+        if not policy:
+            raise HTTPException(status_code=404, detail="Policy not found")
+
+        return detail_response(preconditions, policy, fields)
+
+    return response_cache.respond(
+        preconditions, auth.organisation_id, "policies:detail", (id, fields), load
+    )
@@ -1,107 +1,89 @@
+"""
+Customer portal router.
+
+Customers are not organisation members: each request carries the access token
+their broker issued for one agreement (`POST
+/api/broker/agreements/{id}/access-tokens`) in the `X-Access-Token` header,
+and can only see and act on that agreement. Reads may use a cached
+verification; accept and decline re-check the token inside the transition,
+so a revoked token cannot change the agreement.
+
+Endpoints:
+- GET /api/customer/proposal: The agreement and its instalment schedule
+- POST /api/customer/proposal/accept: Sign a PROPOSED agreement
+- POST /api/customer/proposal/decline: Send a PROPOSED agreement back to DRAFT
+"""
+
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from typing import List, Optional
+
 from database import get_db
-from models import Proposal, ProposalStatusEnum
-from schemas import ProposalResponse
-from middleware.auth import get_current_user
-from middleware.rbac import require_role
-
-router = APIRouter(prefix="/api/customer/proposals", tags=["proposals"])
-
-@router.get("", response_model=List[ProposalResponse])
-def list_proposals(
-    search: Optional[str] = None,
-    status: Optional[str] = None,
-    db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
-):
-    """List all proposals for the customer"""
-    query = db.query(Proposal)
-    
-    # Filter by client (customer context)
-    if current_user.get("client_id"):
-        query = query.filter(Proposal.client_id == current_user["client_id"])
-    
-    # Filter by search term
-    if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            (Proposal.broker_name.ilike(search_term)) |
-            (Proposal.insurance_type.ilike(search_term))
-        )
-    
-    # Filter by status
-    if status:
-        query = query.filter(Proposal.status == status)
-    
-    proposals = query.order_by(Proposal.created_at.desc()).all()
-    return proposals
-
-@router.get("/{proposal_id}", response_model=ProposalResponse)
-def get_proposal(
-    proposal_id: str,
-    db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
-):
-    """Get a specific proposal by ID"""
-    proposal = db.query(Proposal).filter(Proposal.id == proposal_id).first()
-    
-    if not proposal:
-        raise HTTPException(status_code=404, detail="Proposal not found")
-    
-    # Check access (customer can only see their own proposals)
-    if current_user.get("client_id") and proposal.client_id != current_user["client_id"]:
-        raise HTTPException(status_code=403, detail="Access denied")
-    
-    # Mark as viewed if it's new
-    if proposal.status == ProposalStatusEnum.NEW:
-        proposal.status = ProposalStatusEnum.VIEWED
-        db.commit()
-        db.refresh(proposal)
-    
-    return proposal
-
-@router.post("/{proposal_id}/accept")
-def accept_proposal(
-    proposal_id: str,
-    db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+from models import Agreement, AgreementStatusEnum, Instalment
+from schemas import AgreementResponse, InstalmentResponse, PortalAgreementResponse
+from services.access_tokens import AccessTokenContext, get_access_token_context
+from services.agreement_state import record_transition, transition
+from services.cache import response_cache
+from services.outbox import outbox_relay
+from services.serialization import json_response, row_to_dict, rows_to_dicts, schema_columns
+
+router = APIRouter(prefix="/api/customer/proposal", tags=["Customer - Portal"])
+
+# Actor recorded in audit logs and agreement events
+ACTOR = "CUSTOMER"
+
+
+@router.get("", response_model=PortalAgreementResponse)
+async def get_proposal(
+    access: AccessTokenContext = Depends(get_access_token_context),
+    db: Session = Depends(get_db)
 ):
-    """Accept a proposal"""
-    proposal = db.query(Proposal).filter(Proposal.id == proposal_id).first()
-    
-    if not proposal:
-        raise HTTPException(status_code=404, detail="Proposal not found")
-    
-    # Check access
-    if current_user.get("client_id") and proposal.client_id != current_user["client_id"]:
-        raise HTTPException(status_code=403, detail="Access denied")
-    
-    proposal.status = ProposalStatusEnum.ACCEPTED
+    """Get the agreement the access token was issued for."""
+    agreement = db.execute(
+        select(*schema_columns(Agreement, AgreementResponse))
+        .where(Agreement.id == access.agreement_id)
+    ).first()
+    if agreement is None:
+        raise HTTPException(status_code=404, detail="Agreement not found")
+
+    instalments = db.execute(
+        select(*schema_columns(Instalment, InstalmentResponse))
+        .where(Instalment.agreement_id == access.agreement_id)
+        .order_by(Instalment.sequence_number)
+    ).all()
+    return json_response({
+        "agreement": row_to_dict(agreement),
+        "instalments": rows_to_dicts(instalments)
+    })
+
+
+def respond(db: Session, access: AccessTokenContext, target: AgreementStatusEnum):
+    row = transition(
+        db, access.organisation_id, access.agreement_id, target, access_token_id=access.token_id
+    )
+    record_transition(db, row, target, ACTOR)
+    agreement = row_to_dict(row)
+    del agreement["from_status"]
+
     db.commit()
-    db.refresh(proposal)
-    
-    return {"message": "Proposal accepted", "proposal": proposal}
-
-@router.post("/{proposal_id}/decline")
-def decline_proposal(
-    proposal_id: str,
-    db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    response_cache.invalidate(str(access.organisation_id))
+    outbox_relay.wake()
+    return json_response(agreement)
+
+
+@router.post("/accept", response_model=AgreementResponse)
+async def accept_proposal(
+    access: AccessTokenContext = Depends(get_access_token_context),
+    db: Session = Depends(get_db)
 ):
-    """Decline a proposal"""
-    proposal = db.query(Proposal).filter(Proposal.id == proposal_id).first()
-    
-    if not proposal:
-        raise HTTPException(status_code=404, detail="Proposal not found")
-    
-    # Check access
-    if current_user.get("client_id") and proposal.client_id != current_user["client_id"]:
-        raise HTTPException(status_code=403, detail="Access denied")
-    
-    proposal.status = ProposalStatusEnum.DECLINED
-    db.commit()
-    db.refresh(proposal)
-    
-    return {"message": "Proposal declined", "proposal": proposal}
+    """Accept (sign) the proposed agreement."""
+    return respond(db, access, AgreementStatusEnum.SIGNED)
+
+
+@router.post("/decline", response_model=AgreementResponse)
+async def decline_proposal(
+    access: AccessTokenContext = Depends(get_access_token_context),
+    db: Session = Depends(get_db)
+):
+    """Decline the proposed agreement; the broker can revise and re-propose it."""
+    return respond(db, access, AgreementStatusEnum.DRAFT)
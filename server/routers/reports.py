@@ -0,0 +1,241 @@
+"""
+Portfolio reports router.
+
+Endpoints:
+- GET /api/broker/reports/arrears: Missed instalment amounts per agreement and
+  for the organisation, bucketed by days past due
+- GET /api/broker/reports/cashflow: Expected monthly inflows, with what-if
+  default-rate scenarios
+- GET /api/broker/reports/commission: Broker commission earned per month
+
+Reports are computed in a single aggregate query and cached per organisation
+and day; any write to the organisation (or a status sweep that changes its
+instalments) invalidates them.
+"""
+
+from datetime import date, datetime, timezone
+from typing import List, Optional
+
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import Date, cast, func, literal, select, tuple_
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import get_db
+from middleware.auth import AuthContext, get_auth_context
+from middleware.rbac import require_role
+from models import Agreement, CommissionLine, Instalment, InstalmentStatusEnum
+from schemas import ArrearsReportResponse, CashflowReportResponse, CommissionReportResponse
+from services import cashflow
+from services.cache import response_cache
+from services.conditional import Preconditions, conditional_response, get_preconditions, make_etag
+
+router = APIRouter(prefix="/api/broker/reports", tags=["Broker - Reports"])
+
+# Most what-if scenarios one cash-flow request may model
+MAX_SCENARIOS = 10
+
+_BUCKET_KEYS = (
+    "days_0_30_pennies", "days_31_60_pennies", "days_61_90_pennies",
+    "days_90_plus_pennies", "total_pennies", "missed_instalments",
+)
+
+
+def _buckets(row) -> dict:
+    return {key: int(getattr(row, key) or 0) for key in _BUCKET_KEYS}
+
+
+def arrears_report(db: Session, organisation_id, as_of: date) -> dict:
+    """
+    Bucket MISSED instalments by days past due as of `as_of`.
+
+    GROUPING SETS produce the per-agreement rows and the organisation total
+    from the same scan; the total is the row where agreement_id is NULL.
+    """
+    days_past_due = literal(as_of) - cast(Instalment.due_date, Date)
+    amount = Instalment.amount_pennies
+
+    def bucket(condition, name):
+        return func.coalesce(func.sum(amount).filter(condition), 0).label(name)
+
+    stmt = (
+        select(
+            Instalment.agreement_id,
+            Agreement.client_id,
+            bucket(days_past_due <= 30, "days_0_30_pennies"),
+            bucket(days_past_due.between(31, 60), "days_31_60_pennies"),
+            bucket(days_past_due.between(61, 90), "days_61_90_pennies"),
+            bucket(days_past_due > 90, "days_90_plus_pennies"),
+            func.sum(amount).label("total_pennies"),
+            func.count().label("missed_instalments"),
+            func.min(cast(Instalment.due_date, Date)).label("oldest_due_date"),
+        )
+        .join(Agreement, Agreement.id == Instalment.agreement_id)
+        .where(
+            Agreement.organisation_id == organisation_id,
+            Instalment.status == InstalmentStatusEnum.MISSED,
+        )
+        .group_by(func.grouping_sets(
+            tuple_(Instalment.agreement_id, Agreement.client_id),
+            tuple_(),
+        ))
+    )
+
+    totals = dict.fromkeys(_BUCKET_KEYS, 0)
+    agreements = []
+    for row in db.execute(stmt):
+        if row.agreement_id is None:
+            totals = _buckets(row)
+            continue
+        agreements.append({
+            "agreement_id": str(row.agreement_id),
+            "client_id": str(row.client_id),
+            "oldest_due_date": row.oldest_due_date.isoformat(),
+            **_buckets(row),
+        })
+    agreements.sort(key=lambda a: a["total_pennies"], reverse=True)
+
+    return {"as_of": as_of.isoformat(), "totals": totals, "agreements": agreements}
+
+
+@router.get("/arrears", response_model=ArrearsReportResponse)
+async def get_arrears_report(
+    preconditions: Preconditions = Depends(get_preconditions),
+    auth: AuthContext = Depends(get_auth_context),
+    db: Session = Depends(get_db)
+):
+    """
+    Arrears ageing: missed instalment amounts bucketed into 0-30, 31-60,
+    61-90 and 90+ days past due, per agreement (largest first) and in total.
+    """
+    require_role("OWNER", "ADMIN", "MEMBER", "READ_ONLY")(auth)
+    as_of = datetime.now(timezone.utc).date()
+
+    def load(preconditions: Preconditions):
+        content = arrears_report(db, auth.organisation_id, as_of)
+        etag = make_etag("arrears", orjson.dumps(content))
+        return conditional_response(preconditions, etag, None, lambda: content)
+
+    return response_cache.respond(
+        preconditions,
+        auth.organisation_id,
+        "reports:arrears",
+        (as_of.isoformat(),),
+        load,
+        ttl=settings.REPORT_CACHE_TTL_SECONDS
+    )
+
+
+def parse_default_rates(default_rates: Optional[str]) -> List[float]:
+    """
+    Parse comma-separated annualised default rates; no value means a single
+    0.0 (contractual) scenario.
+
+    Raises:
+        HTTPException: 400 if a rate is not a number in [0, 1) or there are too many
+    """
+    if not default_rates:
+        return [0.0]
+    try:
+        rates = [float(rate) for rate in default_rates.split(",") if rate.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="default_rates must be comma-separated numbers")
+    if not rates or len(rates) > MAX_SCENARIOS or any(not 0 <= rate < 1 for rate in rates):
+        raise HTTPException(
+            status_code=400,
+            detail=f"default_rates must hold 1 to {MAX_SCENARIOS} rates between 0 and 1"
+        )
+    return rates
+
+
+@router.get("/cashflow", response_model=CashflowReportResponse)
+async def get_cashflow_report(
+    months: int = Query(12, ge=1, le=120),
+    default_rates: Optional[str] = Query(
+        None, description="Comma-separated annualised default rates to model, e.g. 0.02,0.05"
+    ),
+    preconditions: Preconditions = Depends(get_preconditions),
+    auth: AuthContext = Depends(get_auth_context),
+    db: Session = Depends(get_db)
+):
+    """
+    Expected monthly inflows from UPCOMING instalments of SIGNED and ACTIVE
+    agreements, starting with the current month, plus one projection per
+    requested default rate.
+    """
+    require_role("OWNER", "ADMIN", "MEMBER", "READ_ONLY")(auth)
+    rates = parse_default_rates(default_rates)
+    as_of = datetime.now(timezone.utc).date()
+
+    def load(preconditions: Preconditions):
+        content = cashflow.project(db, auth.organisation_id, as_of, months, rates)
+        etag = make_etag("cashflow", orjson.dumps(content))
+        return conditional_response(preconditions, etag, None, lambda: content)
+
+    return response_cache.respond(
+        preconditions,
+        auth.organisation_id,
+        "reports:cashflow",
+        (as_of.isoformat(), months, tuple(rates)),
+        load,
+        ttl=settings.REPORT_CACHE_TTL_SECONDS
+    )
+
+
+def commission_report(db: Session, organisation_id, since: Optional[date], until: Optional[date]) -> dict:
+    """Sum commission lines per calendar month (UTC) of `earned_at`."""
+    month = func.to_char(func.timezone("UTC", CommissionLine.earned_at), "YYYY-MM")
+    stmt = (
+        select(
+            month.label("month"),
+            func.count().label("lines"),
+            func.sum(CommissionLine.amount_pennies).label("amount_pennies"),
+        )
+        .where(CommissionLine.organisation_id == organisation_id)
+        .group_by(month)
+        .order_by(month)
+    )
+    if since:
+        stmt = stmt.where(CommissionLine.earned_at >= since)
+    if until:
+        stmt = stmt.where(CommissionLine.earned_at < until)
+
+    months = [
+        {"month": row.month, "lines": row.lines, "amount_pennies": int(row.amount_pennies)}
+        for row in db.execute(stmt)
+    ]
+    return {
+        "months": months,
+        "total_lines": sum(m["lines"] for m in months),
+        "total_amount_pennies": sum(m["amount_pennies"] for m in months),
+    }
+
+
+@router.get("/commission", response_model=CommissionReportResponse)
+async def get_commission_report(
+    since: Optional[date] = Query(None, description="Only commission earned on or after this day"),
+    until: Optional[date] = Query(None, description="Only commission earned before this day"),
+    preconditions: Preconditions = Depends(get_preconditions),
+    auth: AuthContext = Depends(get_auth_context),
+    db: Session = Depends(get_db)
+):
+    """
+    Broker commission per month, from the lines written by the commission
+    batch (`python -m services.commission`).
+    """
+    require_role("OWNER", "ADMIN", "MEMBER", "READ_ONLY")(auth)
+
+    def load(preconditions: Preconditions):
+        content = commission_report(db, auth.organisation_id, since, until)
+        etag = make_etag("commission", orjson.dumps(content))
+        return conditional_response(preconditions, etag, None, lambda: content)
+
+    return response_cache.respond(
+        preconditions,
+        auth.organisation_id,
+        "reports:commission",
+        (since, until),
+        load,
+        ttl=settings.REPORT_CACHE_TTL_SECONDS
+    )
@@ -1,6 +1,6 @@
-from pydantic import BaseModel, EmailStr, field_validator
+from pydantic import BaseModel, EmailStr, Field, field_validator, model_validator
 from typing import Optional, List, Any
-from datetime import datetime
+from datetime import date, datetime
 from decimal import Decimal
 import uuid
 from models import (
@@ -31,6 +31,21 @@ class ClientUpdate(BaseModel):
     postcode: Optional[str] = None
 
 
+class ImportRowError(BaseModel):
+    row: int
+    errors: List[str]
+
+
+class ImportReportResponse(BaseModel):
+    chunks: int
+    rows: int
+    inserted: int
+    updated: int
+    skipped: int
+    errors: List[ImportRowError]
+    errors_truncated: bool
+
+
 class ClientResponse(BaseModel):
     id: str
     organisation_id: str
@@ -68,6 +83,17 @@ class PolicyCreate(BaseModel):
     end_date: datetime  # Changed from expiry_date
     premium_amount_pennies: int  # Changed from gross_premium
 
+class PolicyImportRow(PolicyCreate):
+    """Policy import row; the client is referenced by id or by email."""
+    client_id: Optional[uuid.UUID] = None
+    client_email: Optional[str] = None
+
+    @model_validator(mode="after")
+    def require_client_reference(self):
+        if self.client_id is None and not self.client_email:
+            raise ValueError("client_id or client_email is required")
+        return self
+
 class PolicyResponse(BaseModel):
     id: str
     organisation_id: str
@@ -79,6 +105,7 @@ class PolicyResponse(BaseModel):
     end_date: datetime  # Changed from expiry_date
     premium_amount_pennies: int  # Changed from gross_premium
     created_at: datetime
+    updated_at: Optional[datetime] = None
     
     @field_validator('id', 'organisation_id', 'client_id', mode='before')
     @classmethod
@@ -101,6 +128,7 @@ class AgreementCreate(BaseModel):
     apr_bps: int
     term_months: int
     broker_fee_bps: int
+    # First instalment falls a month after this (default: today)
     signed_at: Optional[datetime] = None
 
 class AgreementResponse(BaseModel):
@@ -113,6 +141,7 @@ class AgreementResponse(BaseModel):
     term_months: int
     broker_fee_bps: int
     status: AgreementStatusEnum
+    version: int
     signed_at: Optional[datetime]
     activated_at: Optional[datetime]
     created_at: datetime
@@ -131,6 +160,28 @@ class AgreementResponse(BaseModel):
             uuid.UUID: str
         }
 
+class AgreementTransitionRequest(BaseModel):
+    status: AgreementStatusEnum
+
+class BulkAgreementTransitionRequest(BaseModel):
+    ids: List[uuid.UUID] = Field(..., min_length=1, max_length=1000)
+    status: AgreementStatusEnum
+
+class SkippedTransition(BaseModel):
+    id: str
+    reason: str
+
+class BulkAgreementTransitionResponse(BaseModel):
+    status: AgreementStatusEnum
+    updated: List[str]
+    skipped: List[SkippedTransition]
+
+class AccessTokenResponse(BaseModel):
+    """A newly issued portal token; the plaintext is only returned here."""
+    token: str
+    agreement_id: str
+    expires_at: datetime
+
 # Instalment schemas
 class InstalmentResponse(BaseModel):
     id: str
@@ -203,6 +254,18 @@ class PaginatedResponse(BaseModel):
     data: List
     pagination: PaginationMeta
 
+class ClientListResponse(BaseModel):
+    data: List[ClientResponse]
+    pagination: PaginationMeta
+
+class PortalAgreementResponse(BaseModel):
+    agreement: AgreementResponse
+    instalments: List[InstalmentResponse]
+
+class AgreementListResponse(BaseModel):
+    data: List[AgreementResponse]
+    pagination: PaginationMeta
+
 
 # ============================================================================
 # User schemas
@@ -353,3 +416,88 @@ class AuthMeResponse(BaseModel):
     user: UserResponse
     organisation: OrganisationResponse
     membership: MembershipResponse
+
+
+# ============================================================================
+# Audit log schemas
+# ============================================================================
+
+class AuditLogResponse(BaseModel):
+    id: str
+    organisation_id: str
+    actor_type: str
+    action: str
+    entity: str
+    before: Optional[Any] = None
+    after: Optional[Any] = None
+    created_at: datetime
+
+    @field_validator('id', 'organisation_id', mode='before')
+    @classmethod
+    def convert_uuid_to_str(cls, v):
+        if isinstance(v, uuid.UUID):
+            return str(v)
+        return v
+
+    class Config:
+        from_attributes = True
+
+
+class AuditLogListResponse(BaseModel):
+    """Keyset-paginated audit log page; pass `next_cursor` as `cursor` for the next page."""
+    data: List[AuditLogResponse]
+    next_cursor: Optional[str] = None
+
+
+# ============================================================================
+# Report schemas
+# ============================================================================
+
+class ArrearsBuckets(BaseModel):
+    """Missed instalment amounts by days past due."""
+    days_0_30_pennies: int
+    days_31_60_pennies: int
+    days_61_90_pennies: int
+    days_90_plus_pennies: int
+    total_pennies: int
+    missed_instalments: int
+
+
+class AgreementArrears(ArrearsBuckets):
+    agreement_id: str
+    client_id: str
+    oldest_due_date: date
+
+
+class ArrearsReportResponse(BaseModel):
+    as_of: date
+    totals: ArrearsBuckets
+    agreements: List[AgreementArrears]
+
+
+class CashflowScenario(BaseModel):
+    default_rate: float
+    expected_pennies: List[int]
+    total_expected_pennies: int
+
+
+class CashflowReportResponse(BaseModel):
+    """Monthly inflows; `months` labels (YYYY-MM) align with every amount list."""
+    as_of: date
+    months: List[str]
+    scheduled_pennies: List[int]
+    total_scheduled_pennies: int
+    instalments: int
+    scenarios: List[CashflowScenario]
+
+
+class CommissionMonth(BaseModel):
+    month: str  # YYYY-MM
+    lines: int
+    amount_pennies: int
+
+
+class CommissionReportResponse(BaseModel):
+    months: List[CommissionMonth]
+    total_lines: int
+    total_amount_pennies: int
@@ -4,8 +4,9 @@ from models import (
     Organisation, Client, Policy, Agreement, Instalment,
     OrganisationStatusEnum, AgreementStatusEnum, InstalmentStatusEnum
 )
-from datetime import datetime, timedelta
+from datetime import datetime
 from decimal import Decimal
+from services.schedule import schedule_generator
 
 def seed_database():
     print("🌱 Seeding database...")
@@ -80,8 +81,7 @@ def seed_database():
         print(f"✅ Created agreement: {agreement.id}")
         
         # Create instalments
-        for i in range(term_months):
-            due_date = datetime(2024, 1, 1) + timedelta(days=i * 30)
+        for i, due_date in enumerate(schedule_generator.due_dates(agreement.signed_at, term_months)):
             amount_pennies = int(round(monthly_payment * 100))  # Convert to pennies
 
             instalment = Instalment(
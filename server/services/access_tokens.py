@@ -0,0 +1,249 @@
+"""
+Customer portal access tokens.
+
+Brokers issue a random token per agreement (`issue_token`); only its sha256 is
+stored, in `agreement_access_tokens.token_hash`. Customers send the token in
+the `X-Access-Token` header and `verify` looks the hash up on the unique
+token_hash index, joined to the agreement for its organisation and client.
+
+Portal pages poll, so verified tokens are cached in process for
+ACCESS_TOKEN_CACHE_TTL_SECONDS, never past the token's own expiry. Revoking a
+token invalidates it here; other workers notice within the TTL, which is safe
+because state-changing portal requests re-check the token row in their own
+transaction (`agreement_state.transition`). Unknown and
+expired hashes go to a separate, smaller cache with a short TTL, so requests
+with made-up tokens cannot evict verified ones.
+
+`last_used_at` is not written per request: uses are coalesced in memory and
+flushed every ACCESS_TOKEN_TOUCH_INTERVAL_SECONDS with one UPDATE for all
+tokens used since the last flush (and on shutdown).
+"""
+
+import asyncio
+import hashlib
+import secrets
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional, Tuple
+
+from fastapi import Depends, Header, HTTPException
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import SessionLocal, get_db
+from models import Agreement, AgreementAccessToken
+from services.metrics import AUTH_CACHE_REQUESTS
+
+_hits = AUTH_CACHE_REQUESTS.labels("access_token", "hit")
+_misses = AUTH_CACHE_REQUESTS.labels("access_token", "miss")
+
+_TOUCH = text("""
+    UPDATE agreement_access_tokens t
+    SET last_used_at = u.used_at
+    FROM unnest(CAST(:ids AS uuid[]), CAST(:used_at AS timestamptz[])) AS u(id, used_at)
+    WHERE t.id = u.id
+      AND (t.last_used_at IS NULL OR t.last_used_at < u.used_at)
+""")
+
+
+@dataclass(frozen=True)
+class AccessTokenContext:
+    """What a verified portal token grants access to."""
+    token_id: uuid.UUID
+    agreement_id: uuid.UUID
+    organisation_id: uuid.UUID
+    client_id: uuid.UUID
+    expires_at: datetime
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def issue_token(db: Session, agreement_id, ttl: Optional[timedelta] = None) -> Tuple[str, AgreementAccessToken]:
+    """
+    Stage a new token for an agreement in `db`'s transaction.
+
+    Returns:
+        (plaintext token, to show once; the stored row)
+    """
+    token = secrets.token_urlsafe(32)
+    row = AgreementAccessToken(
+        agreement_id=agreement_id,
+        token_hash=hash_token(token),
+        expires_at=datetime.now(timezone.utc) + (ttl or timedelta(days=settings.ACCESS_TOKEN_TTL_DAYS)),
+    )
+    db.add(row)
+    return token, row
+
+
+class AccessTokenVerifier:
+    """
+    TTL + LRU caches keyed by token hash, one for verified tokens and one
+    for hashes that did not verify, plus the pending `last_used_at` writes.
+
+    Attributes:
+        ttl: Seconds a verified token is trusted
+        touch_interval: Seconds between batched last_used_at writes
+        miss_ttl: Seconds an unknown or expired hash is remembered
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        touch_interval: float,
+        max_entries: int = 10000,
+        miss_ttl: float = 5.0,
+        max_misses: int = 1000,
+    ):
+        self.ttl = ttl
+        self.touch_interval = touch_interval
+        self.max_entries = max_entries
+        self.miss_ttl = miss_ttl
+        self.max_misses = max_misses
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._unknown: "OrderedDict[str, float]" = OrderedDict()
+        self._used: Dict[uuid.UUID, datetime] = {}
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def verify(self, db: Session, token: str) -> Optional[AccessTokenContext]:
+        """
+        Return the token's context, or None if it is unknown or expired.
+
+        Args:
+            db: Session used only on a cache miss
+        """
+        token_hash = hash_token(token)
+        now = time.monotonic()
+        with self._lock:
+            item = self._entries.get(token_hash)
+            if item is not None and item[0] > now:
+                self._entries.move_to_end(token_hash)
+                _hits.value += 1
+                context = item[1]
+            elif self._unknown.get(token_hash, 0) > now:
+                _hits.value += 1
+                return None
+            else:
+                context = None
+        if context is None:
+            _misses.value += 1
+            context = self._load(db, token_hash)
+            ttl = 0.0
+            if context is not None:
+                ttl = min(self.ttl, (context.expires_at - datetime.now(timezone.utc)).total_seconds())
+            with self._lock:
+                if ttl > 0:
+                    self._entries[token_hash] = (now + ttl, context)
+                    self._entries.move_to_end(token_hash)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+                else:
+                    self._unknown[token_hash] = now + self.miss_ttl
+                    self._unknown.move_to_end(token_hash)
+                    while len(self._unknown) > self.max_misses:
+                        self._unknown.popitem(last=False)
+
+        used_at = datetime.now(timezone.utc)
+        if context is None or context.expires_at <= used_at:
+            return None
+        with self._lock:
+            self._used[context.token_id] = used_at
+        return context
+
+    def _load(self, db: Session, token_hash: str) -> Optional[AccessTokenContext]:
+        row = db.execute(
+            select(
+                AgreementAccessToken.id,
+                AgreementAccessToken.agreement_id,
+                Agreement.organisation_id,
+                Agreement.client_id,
+                AgreementAccessToken.expires_at,
+            )
+            .join(Agreement, Agreement.id == AgreementAccessToken.agreement_id)
+            .where(AgreementAccessToken.token_hash == token_hash)
+        ).first()
+        return AccessTokenContext(*row) if row is not None else None
+
+    def invalidate(self, token_hashes: Iterable[str]) -> None:
+        with self._lock:
+            for token_hash in token_hashes:
+                self._entries.pop(token_hash, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._unknown.clear()
+
+    def flush(self) -> int:
+        """Write pending last_used_at values in one UPDATE; returns tokens touched."""
+        with self._lock:
+            used, self._used = self._used, {}
+        if not used:
+            return 0
+        try:
+            with SessionLocal() as db:
+                db.execute(_TOUCH, {"ids": list(used), "used_at": list(used.values())})
+                db.commit()
+        except Exception:
+            # Keep the uses for the next flush unless newer ones arrived
+            with self._lock:
+                for token_id, used_at in used.items():
+                    self._used.setdefault(token_id, used_at)
+            raise
+        return len(used)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.touch_interval)
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception:
+                # Database unavailable; retried at the next interval
+                pass
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await asyncio.to_thread(self.flush)
+        except Exception:
+            pass
+
+
+access_token_verifier = AccessTokenVerifier(
+    settings.ACCESS_TOKEN_CACHE_TTL_SECONDS, settings.ACCESS_TOKEN_TOUCH_INTERVAL_SECONDS
+)
+
+
+def get_access_token_context(
+    x_access_token: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+) -> AccessTokenContext:
+    """
+    Dependency authenticating a customer portal request.
+
+    Raises:
+        HTTPException: 401 if the token is missing, unknown or expired
+    """
+    if not x_access_token:
+        raise HTTPException(status_code=401, detail="X-Access-Token header required")
+    context = access_token_verifier.verify(db, x_access_token)
+    if context is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired access token")
+    return context
@@ -0,0 +1,216 @@
+"""
+Agreement status state machine.
+
+Every status change goes through `transition`, which applies it as one
+conditional statement:
+
+    UPDATE agreements SET status = :to, version = version + 1, ...
+    WHERE id = :id AND status IN (<states allowed to reach :to>)
+      [AND version = :expected_version]
+    RETURNING ...
+
+Postgres re-checks the WHERE clause against the latest row version when two
+writers race, so exactly one of two concurrent transitions from the same
+state wins and the other sees zero rows; nothing is read first and no update
+is lost. Only the failure path spends a second query, to tell the caller
+whether the agreement is missing (404), was changed since they read it
+(412, `If-Match` did not match `version`) or is in the wrong state (409).
+
+Clients doing read-modify-write send back the ETag of their last read in
+`If-Match`. Agreement detail and transition responses both carry the strong
+`version_etag`, `"3"` (with a suffix for sparse fieldsets, which still names
+version 3).
+"""
+
+import uuid
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import exists, func, select, update
+from sqlalchemy.orm import Session
+
+from models import Agreement, AgreementAccessToken, AgreementStatusEnum as S
+from schemas import AgreementResponse
+from services.audit_sink import audit_sink
+from services.conditional import parse_version_etag
+from services.outbox import record_event
+from services.serialization import schema_columns
+
+TRANSITIONS: Dict[S, FrozenSet[S]] = {
+    S.DRAFT: frozenset({S.PROPOSED}),
+    S.PROPOSED: frozenset({S.DRAFT, S.SIGNED}),
+    S.SIGNED: frozenset({S.ACTIVE, S.TERMINATED}),
+    S.ACTIVE: frozenset({S.DEFAULTED, S.TERMINATED}),
+    S.DEFAULTED: frozenset({S.ACTIVE, S.TERMINATED}),
+    S.TERMINATED: frozenset(),
+}
+
+# States each target can be reached from
+SOURCES: Dict[S, FrozenSet[S]] = {
+    target: frozenset(source for source, targets in TRANSITIONS.items() if target in targets)
+    for target in S
+}
+
+# Minimum role per target; ending an agreement is an admin decision
+MINIMUM_ROLE: Dict[S, str] = {target: "MEMBER" for target in S}
+MINIMUM_ROLE[S.TERMINATED] = "ADMIN"
+
+
+def _token_valid(access_token_id):
+    return exists().where(
+        AgreementAccessToken.id == access_token_id,
+        AgreementAccessToken.expires_at > func.now(),
+    )
+
+
+def _transition_statement(
+    organisation_id,
+    agreement_ids: Sequence,
+    target: S,
+    expected_version: Optional[int] = None,
+    access_token_id=None,
+):
+    # `prev` locks the rows (in id order, so overlapping bulk requests cannot
+    # deadlock) and yields their pre-update status for the events
+    prev = (
+        select(Agreement.id, Agreement.status)
+        .where(Agreement.id.in_(agreement_ids), Agreement.organisation_id == organisation_id)
+        .order_by(Agreement.id)
+        .with_for_update()
+        .subquery("prev")
+    )
+    values = {"status": target, "version": Agreement.version + 1, "updated_at": func.now()}
+    if target == S.SIGNED:
+        values["signed_at"] = func.coalesce(Agreement.signed_at, func.now())
+    elif target == S.ACTIVE:
+        values["activated_at"] = func.coalesce(Agreement.activated_at, func.now())
+    stmt = (
+        update(Agreement)
+        .where(Agreement.id == prev.c.id, Agreement.status.in_(SOURCES[target]))
+        .values(values)
+        .returning(prev.c.status.label("from_status"), *schema_columns(Agreement, AgreementResponse))
+    )
+    if expected_version is not None:
+        stmt = stmt.where(Agreement.version == expected_version)
+    if access_token_id is not None:
+        # Portal changes re-check the token in the same statement, so a token
+        # revoked on another worker cannot act on a cached verification
+        stmt = stmt.where(_token_valid(access_token_id))
+    return stmt
+
+
+def parse_if_match(if_match: Optional[str]) -> Optional[int]:
+    """
+    Expected version from an `If-Match` header; None when absent or `*`.
+
+    Raises:
+        HTTPException: 412 for a weak tag, 400 if the header is not a version
+            ETag
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+    tag = if_match.strip()
+    if tag.startswith("W/"):
+        # Weak tags never match under If-Match's strong comparison (RFC 7232)
+        raise HTTPException(status_code=412, detail="Agreement has been modified")
+    try:
+        return parse_version_etag(tag)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="If-Match must be the agreement version, e.g. \"3\"")
+
+
+def transition(
+    db: Session,
+    organisation_id: str,
+    agreement_id: str,
+    target: S,
+    expected_version: Optional[int] = None,
+    access_token_id=None,
+):
+    """
+    Move one agreement to `target` in `db`'s transaction; the caller commits.
+
+    Args:
+        access_token_id: For customer portal changes, the token that must
+            still exist and be unexpired
+
+    Returns:
+        The updated agreement row, with `from_status`
+
+    Raises:
+        HTTPException: 401 token revoked or expired, 404 not found, 412
+            version mismatch, 409 transition not allowed from the current
+            status
+    """
+    row = db.execute(
+        _transition_statement(organisation_id, [agreement_id], target, expected_version, access_token_id),
+        execution_options={"synchronize_session": False},
+    ).first()
+    if row is not None:
+        return row
+
+    if access_token_id is not None and not db.execute(select(_token_valid(access_token_id))).scalar():
+        raise HTTPException(status_code=401, detail="Invalid or expired access token")
+
+    current = db.execute(
+        select(Agreement.status, Agreement.version)
+        .where(Agreement.id == agreement_id, Agreement.organisation_id == organisation_id)
+    ).first()
+    if current is None:
+        raise HTTPException(status_code=404, detail="Agreement not found")
+    if expected_version is not None and current.version != expected_version:
+        raise HTTPException(status_code=412, detail="Agreement has been modified")
+    raise HTTPException(
+        status_code=409,
+        detail=f"Cannot move agreement from {current.status.value} to {target.value}"
+    )
+
+
+def record_transition(db: Session, row, target: S, actor_type: str) -> None:
+    """Stage the STATUS_CHANGED event and audit row for a `transition` result."""
+    change = {"from": row.from_status.value, "to": target.value}
+    record_event(db, row.organisation_id, row.id, "STATUS_CHANGED", actor_type, meta=change)
+    audit_sink.record(
+        db,
+        row.organisation_id,
+        actor_type,
+        "TRANSITION",
+        "AGREEMENT",
+        before={"id": str(row.id), "status": change["from"]},
+        after={"id": str(row.id), "status": change["to"]}
+    )
+
+
+def transition_many(
+    db: Session,
+    organisation_id: str,
+    agreement_ids: Sequence,
+    target: S,
+) -> Tuple[List, List[dict]]:
+    """
+    Move many agreements to `target` with one set-based UPDATE; the caller
+    commits. Agreements that are missing or not in a source state are
+    skipped, which costs one more query only when there are any.
+
+    Returns:
+        (updated rows with `from_status`, skipped {id, reason} dicts)
+    """
+    rows = db.execute(
+        _transition_statement(organisation_id, agreement_ids, target),
+        execution_options={"synchronize_session": False},
+    ).all()
+    updated = {str(row.id) for row in rows}
+    remaining = [str(agreement_id) for agreement_id in agreement_ids if str(agreement_id) not in updated]
+    if not remaining:
+        return rows, []
+
+    current = dict(db.execute(
+        select(Agreement.id, Agreement.status)
+        .where(Agreement.id.in_(remaining), Agreement.organisation_id == organisation_id)
+    ).all())
+    skipped = []
+    for agreement_id in remaining:
+        status = current.get(uuid.UUID(agreement_id))
+        reason = "not_found" if status is None else f"cannot move from {status.value} to {target.value}"
+        skipped.append({"id": agreement_id, "reason": reason})
+    return rows, skipped
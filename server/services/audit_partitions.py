@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Monthly partition maintenance for `audit_logs`.
+
+`audit_logs` is range-partitioned on `created_at`, one partition per UTC
+month (`audit_logs_YYYY_MM`) plus `audit_logs_default` for anything else.
+Run this daily (cron, scheduled job) to:
+
+- create partitions for the current month and AUDIT_PARTITION_PREMAKE_MONTHS
+  ahead, and for any month that has rows sitting in the default partition
+  (those rows are moved into the new partition);
+- expire partitions entirely older than AUDIT_RETENTION_MONTHS, either by
+  detaching them into the AUDIT_ARCHIVE_SCHEMA schema (`archive`, for
+  offloading with pg_dump) or dropping them (`drop`). Retention 0 keeps
+  everything.
+
+Usage:
+    python -m services.audit_partitions [--dry-run]
+"""
+
+import argparse
+import re
+from datetime import date, datetime, timezone
+from typing import Dict, List
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from config import settings
+from database import engine
+
+PARENT = "audit_logs"
+DEFAULT_PARTITION = "audit_logs_default"
+_PARTITION_NAME = re.compile(r"^audit_logs_(\d{4})_(\d{2})$")
+# Arbitrary constant so concurrent runs do not race each other
+_LOCK_KEY = 0x61756469
+
+
+def add_months(month: date, n: int) -> date:
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT}_{month:%Y_%m}"
+
+
+def _bound(month: date) -> str:
+    return f"{month.isoformat()} 00:00:00+00"
+
+
+def existing_partitions(conn: Connection) -> Dict[date, str]:
+    """Monthly partitions currently attached to audit_logs, by month."""
+    rows = conn.execute(text("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'public.audit_logs'::regclass
+    """)).scalars()
+    partitions = {}
+    for name in rows:
+        match = _PARTITION_NAME.match(name)
+        if match:
+            partitions[date(int(match.group(1)), int(match.group(2)), 1)] = name
+    return partitions
+
+
+def create_partition(conn: Connection, month: date) -> None:
+    """
+    Create and attach the partition for `month`.
+
+    Rows for that month already in the default partition are moved first,
+    since attaching a range that overlaps rows in the default partition fails.
+    """
+    name = partition_name(month)
+    lower, upper = _bound(month), _bound(add_months(month, 1))
+    conn.execute(text(
+        f"CREATE TABLE public.{name} (LIKE public.{PARENT} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+    ))
+    conn.execute(text(f"""
+        WITH moved AS (
+            DELETE FROM public.{DEFAULT_PARTITION}
+            WHERE created_at >= :lower AND created_at < :upper
+            RETURNING *
+        )
+        INSERT INTO public.{name} SELECT * FROM moved
+    """), {"lower": lower, "upper": upper})
+    conn.execute(text(
+        f"ALTER TABLE public.{PARENT} ATTACH PARTITION public.{name} "
+        f"FOR VALUES FROM ('{lower}') TO ('{upper}')"
+    ))
+
+
+def expire_partition(conn: Connection, name: str, action: str) -> None:
+    if action == "drop":
+        conn.execute(text(f"DROP TABLE public.{name}"))
+        return
+    schema = settings.AUDIT_ARCHIVE_SCHEMA
+    conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {schema}"))
+    conn.execute(text(f"ALTER TABLE public.{PARENT} DETACH PARTITION public.{name}"))
+    conn.execute(text(f"ALTER TABLE public.{name} SET SCHEMA {schema}"))
+
+
+def _months_in_default(conn: Connection) -> List[date]:
+    return [
+        value.date() if isinstance(value, datetime) else value
+        for value in conn.execute(text(f"""
+            SELECT DISTINCT date_trunc('month', created_at AT TIME ZONE 'UTC')
+            FROM public.{DEFAULT_PARTITION}
+        """)).scalars()
+    ]
+
+
+def run(
+    premake_months: int,
+    retention_months: int,
+    action: str,
+    dry_run: bool = False,
+    today: date = None,
+) -> List[str]:
+    """
+    Bring partitions in line with the settings.
+
+    Each partition is created or expired in its own transaction so a long
+    run never holds locks on audit_logs for longer than one step.
+
+    Returns:
+        Human-readable list of the steps taken (or planned, for dry runs)
+    """
+    if action not in ("archive", "drop"):
+        raise ValueError(f"Unknown AUDIT_RETENTION_ACTION: {action}")
+    today = today or datetime.now(timezone.utc).date()
+    current = today.replace(day=1)
+    steps = []
+
+    with engine.connect() as lock_conn:
+        if not lock_conn.execute(text("SELECT pg_try_advisory_lock(:k)"), {"k": _LOCK_KEY}).scalar():
+            return ["another maintenance run holds the lock; nothing done"]
+        try:
+            with engine.connect() as conn:
+                kind = conn.execute(text(
+                    "SELECT relkind FROM pg_class WHERE oid = 'public.audit_logs'::regclass"
+                )).scalar()
+                if kind != "p":
+                    raise SystemExit("audit_logs is not partitioned; apply the partitioning migration first")
+                partitions = existing_partitions(conn)
+                wanted = {add_months(current, n) for n in range(premake_months + 1)}
+                wanted.update(_months_in_default(conn))
+                conn.rollback()
+
+            for month in sorted(wanted):
+                if month in partitions:
+                    continue
+                name = partition_name(month)
+                steps.append(f"create {name}")
+                partitions[month] = name
+                if not dry_run:
+                    with engine.begin() as conn:
+                        create_partition(conn, month)
+
+            if retention_months > 0:
+                cutoff = add_months(current, -retention_months)
+                for month, name in sorted(partitions.items()):
+                    if month >= cutoff:
+                        continue
+                    steps.append(f"{action} {name}")
+                    if not dry_run:
+                        with engine.begin() as conn:
+                            expire_partition(conn, name, action)
+        finally:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": _LOCK_KEY})
+            lock_conn.commit()
+    return steps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--dry-run", action="store_true", help="Print the plan without changing anything")
+    args = parser.parse_args()
+
+    steps = run(
+        settings.AUDIT_PARTITION_PREMAKE_MONTHS,
+        settings.AUDIT_RETENTION_MONTHS,
+        settings.AUDIT_RETENTION_ACTION,
+        dry_run=args.dry_run,
+    )
+    for step in steps or ["partitions up to date"]:
+        print(step)
+
+
+if __name__ == "__main__":
+    main()
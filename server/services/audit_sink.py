@@ -0,0 +1,250 @@
+"""
+Audit log sink.
+
+Two modes, selected by AUDIT_SINK_MODE:
+
+- `transactional` (default): the `AuditLog` row is added to the request's
+  session and commits atomically with the change it describes.
+- `async`: events are held on the session until it commits, then handed to an
+  in-process queue. A background thread writes them with multi-row INSERTs,
+  flushing when AUDIT_SINK_BATCH_SIZE events are waiting or every
+  AUDIT_SINK_FLUSH_INTERVAL_SECONDS. Rolled-back transactions never emit
+  events. When the queue is full the committing request inserts its own
+  events synchronously, so events are never dropped, and shutdown drains
+  whatever is still queued.
+
+A batch whose INSERT fails (e.g. while the database restarts), whether
+written by the background thread or synchronously by a request, is logged
+and retried by the writer with exponential backoff, up to
+AUDIT_SINK_MAX_RETRIES times. Only then is it dropped: the rows are logged at
+error level and counted in audit_events_total{result="failed"}.
+
+Async mode trades the atomic guarantee (a crash after commit but before the
+next flush loses the queued and retrying events) for not paying per-row
+audit latency on bulk operations.
+"""
+
+import logging
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from typing import Deque, List, Optional, Tuple
+
+from sqlalchemy import event, insert
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import SessionLocal, engine
+from models import AuditLog
+from services.metrics import AUDIT_EVENTS, AUDIT_QUEUE_DEPTH
+
+logger = logging.getLogger(__name__)
+
+# Session.info key holding events recorded in the current transaction
+_PENDING = "audit_events"
+# Longest wait between retries of a failed batch
+_MAX_BACKOFF_SECONDS = 60.0
+
+_queued = AUDIT_EVENTS.labels("queued")
+_batched = AUDIT_EVENTS.labels("batched")
+_sync = AUDIT_EVENTS.labels("sync")
+_failed = AUDIT_EVENTS.labels("failed")
+
+
+class AuditSink:
+    """
+    Routes audit events either into the request transaction or to a batching
+    background writer.
+
+    Attributes:
+        mode: "transactional" or "async"
+        batch_size: Maximum rows per INSERT
+        flush_interval: Maximum seconds an event waits in the queue; also the
+            first retry delay of a failed batch
+        max_retries: Retries of a failed batch before it is dropped
+    """
+
+    def __init__(
+        self,
+        mode: str,
+        batch_size: int,
+        flush_interval: float,
+        queue_size: int,
+        max_retries: int = 5,
+    ):
+        if mode not in ("transactional", "async"):
+            raise ValueError(f"Unknown AUDIT_SINK_MODE: {mode}")
+        self.mode = mode
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self._queue: "queue.Queue[dict]" = queue.Queue(maxsize=queue_size)
+        # (retry due at, attempts so far, rows) for failed batches
+        self._retries: Deque[Tuple[float, int, List[dict]]] = deque()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def record(
+        self,
+        db: Session,
+        organisation_id,
+        actor_type: str,
+        action: str,
+        entity: str,
+        before: Optional[dict] = None,
+        after: Optional[dict] = None,
+    ) -> None:
+        """Record one audit event as part of `db`'s current transaction."""
+        row = {
+            "id": uuid.uuid4(),
+            "organisation_id": organisation_id,
+            "actor_type": actor_type,
+            "action": action,
+            "entity": entity,
+            "before": before,
+            "after": after,
+            "created_at": datetime.now(timezone.utc),
+        }
+        self.record_many(db, [row])
+
+    def record_many(self, db: Session, rows: List[dict]) -> None:
+        """
+        Record pre-built audit rows (bulk operations).
+
+        Each row needs organisation_id, actor_type, action and entity; id and
+        created_at are filled in when missing.
+        """
+        now = datetime.now(timezone.utc)
+        for row in rows:
+            row.setdefault("id", uuid.uuid4())
+            row.setdefault("created_at", now)
+        # Without a running writer (scripts, benchmarks) stay transactional
+        if self.mode == "transactional" or not self.running:
+            if len(rows) == 1:
+                db.add(AuditLog(**rows[0]))
+            else:
+                db.execute(insert(AuditLog), rows)
+            return
+        db.info.setdefault(_PENDING, []).extend(rows)
+
+    def _enqueue(self, rows: List[dict]) -> None:
+        """Hand committed events to the writer, inserting inline if the queue is full."""
+        for i, row in enumerate(rows):
+            try:
+                self._queue.put_nowait(row)
+            except queue.Full:
+                self._write(rows[i:], _sync)
+                break
+            _queued.value += 1
+        AUDIT_QUEUE_DEPTH._default.value = self._queue.qsize()
+
+    def _write(self, rows: List[dict], counter, attempts: int = 0) -> None:
+        """Insert `rows`, scheduling a retry (or dropping them) on failure."""
+        try:
+            with engine.begin() as conn:
+                conn.execute(insert(AuditLog), rows)
+        except Exception:
+            attempts += 1
+            if attempts > self.max_retries:
+                _failed.value += len(rows)
+                logger.error(
+                    "Dropping %d audit events after %d failed attempts: %r",
+                    len(rows), attempts, rows, exc_info=True
+                )
+                return
+            delay = min(self.flush_interval * 2 ** (attempts - 1), _MAX_BACKOFF_SECONDS)
+            logger.error(
+                "Writing %d audit events failed (attempt %d); retrying in %.1fs",
+                len(rows), attempts, delay, exc_info=True
+            )
+            self._retries.append((time.monotonic() + delay, attempts, rows))
+            return
+        counter.value += len(rows)
+
+    def _retry_due(self, force: bool = False) -> None:
+        """Retry failed batches whose backoff has elapsed (all of them if `force`)."""
+        now = time.monotonic()
+        for _ in range(len(self._retries)):
+            due_at, attempts, rows = self._retries.popleft()
+            if force or due_at <= now:
+                self._write(rows, _batched, attempts)
+            else:
+                self._retries.append((due_at, attempts, rows))
+
+    def _drain(self, block: bool) -> List[dict]:
+        batch = []
+        try:
+            if block:
+                batch.append(self._queue.get(timeout=self.flush_interval))
+            while len(batch) < self.batch_size:
+                batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def flush(self) -> None:
+        """Write everything currently queued, retrying failed batches now."""
+        self._retry_due(force=True)
+        while True:
+            batch = self._drain(block=False)
+            if not batch:
+                break
+            self._write(batch, _batched)
+        AUDIT_QUEUE_DEPTH._default.value = self._queue.qsize()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._retry_due()
+            batch = self._drain(block=True)
+            if batch:
+                self._write(batch, _batched)
+            AUDIT_QUEUE_DEPTH._default.value = self._queue.qsize()
+
+    def start(self) -> None:
+        if self.mode == "async" and self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the writer and drain the queue; batches still failing are dropped."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join(timeout=self.flush_interval * 2)
+            self._thread = None
+        self.flush()
+        while self._retries:
+            _, attempts, rows = self._retries.popleft()
+            _failed.value += len(rows)
+            logger.error(
+                "Dropping %d audit events at shutdown after %d failed attempts: %r",
+                len(rows), attempts, rows
+            )
+
+
+audit_sink = AuditSink(
+    settings.AUDIT_SINK_MODE,
+    settings.AUDIT_SINK_BATCH_SIZE,
+    settings.AUDIT_SINK_FLUSH_INTERVAL_SECONDS,
+    settings.AUDIT_SINK_QUEUE_SIZE,
+    settings.AUDIT_SINK_MAX_RETRIES,
+)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _on_commit(session: Session) -> None:
+    rows = session.info.pop(_PENDING, None)
+    if rows:
+        audit_sink._enqueue(rows)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _on_rollback(session: Session) -> None:
+    session.info.pop(_PENDING, None)
@@ -0,0 +1,386 @@
+"""
+Bulk imports from CSV or NDJSON uploads.
+
+Uploads are read record by record (`read_records`) and processed in chunks of
+IMPORT_CHUNK_SIZE: each chunk is validated against the create schema, checked
+against the database with one query, written with one multi-row statement
+and committed, so memory stays flat however large the file is and rows loaded
+before a failure stay loaded. Rows that fail are reported with their 1-based
+record number (the CSV header is not counted) instead of failing the import.
+
+Importers are generators that update an `ImportReport` and yield after each
+committed chunk; `run_import` drains one for a single JSON report and
+`stream_import` turns it into NDJSON progress lines.
+
+- Clients: emails the organisation already has (case-insensitive) are
+  skipped. Client imports for one organisation are serialized by a
+  transaction-scoped advisory lock, so two concurrent uploads cannot both
+  insert the same new email.
+- Policies: each row names its client by `client_id` or `client_email`, and
+  is upserted on (organisation_id, policy_number), so re-sending a
+  bordereau updates the policies it already loaded. A row naming a different
+  client than the existing policy is rejected rather than moving the policy
+  (and its agreements) to another client.
+"""
+
+import codecs
+import csv
+import shutil
+import tempfile
+import uuid
+from datetime import datetime, timezone
+from itertools import islice
+from typing import BinaryIO, Callable, Iterable, Iterator, List, Optional, Tuple
+
+import orjson
+from pydantic import ValidationError
+from sqlalchemy import func, insert, literal_column, or_, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import SessionLocal
+from middleware.auth import AuthContext
+from models import Client, Policy
+from schemas import ClientCreate, PolicyImportRow
+from services.audit_sink import audit_sink
+from services.cache import response_cache
+
+# Cap on reported row errors; counts stay exact beyond it
+MAX_REPORTED_ERRORS = 1000
+# Uploads copied for streamed imports stay in memory up to this size
+_SPOOL_MAX_SIZE = 1024 * 1024
+# Arbitrary constant; the second lock key is the organisation
+_LOCK_KEY = 0x696D7074
+
+Record = Tuple[int, Optional[dict], Optional[str]]
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str]) -> str:
+    """Pick the upload format from its file extension, then its content type."""
+    name = (filename or "").lower()
+    if name.endswith((".ndjson", ".jsonl")) or (content_type or "").endswith("ndjson"):
+        return "ndjson"
+    return "csv"
+
+
+def read_records(file: BinaryIO, fmt: str) -> Iterator[Record]:
+    """
+    Yield (record number, fields, parse error) for each record in the upload.
+
+    CSV needs a header row; empty cells become None. NDJSON lines must be
+    JSON objects; blank lines are skipped.
+    """
+    lines = codecs.iterdecode(file, "utf-8-sig")
+    if fmt == "csv":
+        for number, row in enumerate(csv.DictReader(lines), start=1):
+            yield number, {k: (v or None) for k, v in row.items() if k is not None}, None
+        return
+
+    number = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            record = orjson.loads(line)
+        except orjson.JSONDecodeError:
+            yield number, None, "invalid JSON"
+            continue
+        if not isinstance(record, dict):
+            yield number, None, "expected a JSON object"
+            continue
+        yield number, record, None
+
+
+def chunked(records: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(records)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def validation_messages(exc: ValidationError) -> List[str]:
+    return [
+        f"{'.'.join(str(part) for part in error['loc']) or 'row'}: {error['msg']}"
+        for error in exc.errors()
+    ]
+
+
+class ImportReport:
+    """Running totals and row errors for one import."""
+
+    def __init__(self):
+        self.chunks = 0
+        self.rows = 0
+        self.inserted = 0
+        self.updated = 0
+        self.skipped = 0
+        self.errors: List[dict] = []
+
+    def reject(self, row: int, messages: List[str]) -> None:
+        self.skipped += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "errors": messages})
+
+    def progress(self) -> dict:
+        return {
+            "chunks": self.chunks,
+            "rows": self.rows,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "skipped": self.skipped,
+        }
+
+    def as_dict(self) -> dict:
+        return {
+            **self.progress(),
+            "errors": sorted(self.errors, key=lambda error: error["row"]),
+            "errors_truncated": self.skipped > len(self.errors),
+        }
+
+
+def lock_organisation(db: Session, organisation_id: str) -> None:
+    db.execute(
+        text("SELECT pg_advisory_xact_lock(:k, hashtext(:org))"),
+        {"k": _LOCK_KEY, "org": str(organisation_id)},
+    )
+
+
+Importer = Callable[[Session, AuthContext, BinaryIO, str, ImportReport], Iterator[ImportReport]]
+
+
+def run_import(importer: Importer, db: Session, auth: AuthContext, file: BinaryIO, fmt: str) -> dict:
+    """Run an import to completion and return its report."""
+    report = ImportReport()
+    for _ in importer(db, auth, file, fmt, report):
+        pass
+    return report.as_dict()
+
+
+def stream_import(importer: Importer, auth: AuthContext, file: BinaryIO, fmt: str) -> Iterator[bytes]:
+    """
+    Run an import, yielding an NDJSON progress line per committed chunk and
+    the full report as the last line.
+
+    The request's session and upload are both closed before a streaming
+    response body is sent, so the upload is copied to a spooled temporary
+    file first and the import uses its own session.
+    """
+    upload = tempfile.SpooledTemporaryFile(max_size=_SPOOL_MAX_SIZE)
+    shutil.copyfileobj(file, upload)
+    upload.seek(0)
+
+    def lines() -> Iterator[bytes]:
+        report = ImportReport()
+        with upload, SessionLocal() as db:
+            for _ in importer(db, auth, upload, fmt, report):
+                yield orjson.dumps(report.progress(), option=orjson.OPT_APPEND_NEWLINE)
+        yield orjson.dumps(report.as_dict(), option=orjson.OPT_APPEND_NEWLINE)
+
+    return lines()
+
+
+def import_clients(
+    db: Session, auth: AuthContext, file: BinaryIO, fmt: str, report: ImportReport
+) -> Iterator[ImportReport]:
+    """
+    Import clients, skipping invalid rows and emails the organisation
+    already has (case-insensitively, including earlier rows of the file).
+    """
+    organisation_id = uuid.UUID(auth.organisation_id)
+    seen = set()
+
+    for chunk in chunked(read_records(file, fmt), settings.IMPORT_CHUNK_SIZE):
+        report.chunks += 1
+        report.rows += len(chunk)
+        valid = []
+        for number, record, error in chunk:
+            if error:
+                report.reject(number, [error])
+                continue
+            try:
+                client = ClientCreate.model_validate(record)
+            except ValidationError as exc:
+                report.reject(number, validation_messages(exc))
+                continue
+            email = client.email.lower()
+            if email in seen:
+                report.reject(number, ["email: duplicate of an earlier row"])
+                continue
+            seen.add(email)
+            valid.append((number, email, client))
+        if not valid:
+            yield report
+            continue
+
+        lock_organisation(db, organisation_id)
+        existing = set(db.execute(
+            select(func.lower(Client.email)).where(
+                Client.organisation_id == organisation_id,
+                func.lower(Client.email).in_([email for _, email, _ in valid]),
+            )
+        ).scalars())
+
+        now = datetime.now(timezone.utc)
+        rows = []
+        for number, email, client in valid:
+            if email in existing:
+                report.reject(number, ["email: a client with this email already exists"])
+                continue
+            rows.append({
+                "id": uuid.uuid4(),
+                "organisation_id": organisation_id,
+                "created_at": now,
+                "updated_at": now,
+                **client.model_dump(),
+            })
+        if not rows:
+            db.rollback()
+            yield report
+            continue
+
+        db.execute(insert(Client), rows)
+        audit_sink.record_many(db, [
+            {
+                "organisation_id": organisation_id,
+                "actor_type": auth.role,
+                "action": "CREATE",
+                "entity": "CLIENT",
+                "after": {"id": str(row["id"]), "email": row["email"]},
+            }
+            for row in rows
+        ])
+        db.commit()
+        report.inserted += len(rows)
+        response_cache.invalidate(auth.organisation_id)
+        yield report
+
+
+def resolve_clients(db: Session, organisation_id, rows: List[PolicyImportRow]) -> Tuple[set, dict]:
+    """
+    Look up every client a chunk refers to with one query.
+
+    Returns:
+        (ids of the organisation's clients among those referenced,
+         lower(email) -> list of matching client ids)
+    """
+    ids = {row.client_id for row in rows if row.client_id is not None}
+    emails = {row.client_email.lower() for row in rows if row.client_id is None}
+    conditions = []
+    if ids:
+        conditions.append(Client.id.in_(ids))
+    if emails:
+        conditions.append(func.lower(Client.email).in_(emails))
+    found = db.execute(
+        select(Client.id, func.lower(Client.email)).where(
+            Client.organisation_id == organisation_id, or_(*conditions)
+        )
+    ).all()
+    by_email: dict = {}
+    for client_id, email in found:
+        by_email.setdefault(email, []).append(client_id)
+    return {client_id for client_id, _ in found}, by_email
+
+
+def import_policies(
+    db: Session, auth: AuthContext, file: BinaryIO, fmt: str, report: ImportReport
+) -> Iterator[ImportReport]:
+    """
+    Upsert policies on (organisation_id, policy_number), resolving each row's
+    client by id or email. A policy number repeated later in the file is
+    rejected rather than overwriting the earlier row.
+    """
+    organisation_id = uuid.UUID(auth.organisation_id)
+    seen = set()
+
+    for chunk in chunked(read_records(file, fmt), settings.IMPORT_CHUNK_SIZE):
+        report.chunks += 1
+        report.rows += len(chunk)
+        valid = []
+        for number, record, error in chunk:
+            if error:
+                report.reject(number, [error])
+                continue
+            try:
+                policy = PolicyImportRow.model_validate(record)
+            except ValidationError as exc:
+                report.reject(number, validation_messages(exc))
+                continue
+            if policy.policy_number in seen:
+                report.reject(number, ["policy_number: duplicate of an earlier row"])
+                continue
+            seen.add(policy.policy_number)
+            valid.append((number, policy))
+        if not valid:
+            yield report
+            continue
+
+        client_ids, by_email = resolve_clients(db, organisation_id, [policy for _, policy in valid])
+
+        now = datetime.now(timezone.utc)
+        rows = []
+        numbers = {}
+        for number, policy in valid:
+            if policy.client_id is not None:
+                if policy.client_id not in client_ids:
+                    report.reject(number, ["client_id: client not found"])
+                    continue
+                client_id = policy.client_id
+            else:
+                matches = by_email.get(policy.client_email.lower(), [])
+                if len(matches) != 1:
+                    report.reject(number, [
+                        "client_email: client not found" if not matches
+                        else f"client_email: matches {len(matches)} clients; use client_id"
+                    ])
+                    continue
+                client_id = matches[0]
+            numbers[policy.policy_number] = number
+            rows.append({
+                "id": uuid.uuid4(),
+                "organisation_id": organisation_id,
+                "created_at": now,
+                "updated_at": now,
+                **policy.model_dump(exclude={"client_id", "client_email"}),
+                "client_id": client_id,
+            })
+        if not rows:
+            db.rollback()
+            yield report
+            continue
+
+        stmt = pg_insert(Policy).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Policy.organisation_id, Policy.policy_number],
+            set_={
+                column: stmt.excluded[column]
+                for column in ("insurer", "product_type", "start_date",
+                               "end_date", "premium_amount_pennies", "updated_at")
+            },
+            # A policy never changes client; such rows are not returned
+            where=Policy.client_id == stmt.excluded.client_id,
+        ).returning(
+            Policy.id,
+            Policy.policy_number,
+            # xmax is 0 for a freshly inserted row version
+            literal_column("xmax = 0").label("inserted"),
+        )
+        written = db.execute(stmt).all()
+        for policy_number in numbers.keys() - {row.policy_number for row in written}:
+            report.reject(numbers[policy_number], ["client: policy belongs to a different client"])
+        audit_sink.record_many(db, [
+            {
+                "organisation_id": organisation_id,
+                "actor_type": auth.role,
+                "action": "CREATE" if row.inserted else "UPDATE",
+                "entity": "POLICY",
+                "after": {"id": str(row.id), "policy_number": row.policy_number},
+            }
+            for row in written
+        ])
+        db.commit()
+        inserted = sum(1 for row in written if row.inserted)
+        report.inserted += inserted
+        report.updated += len(written) - inserted
+        response_cache.invalidate(auth.organisation_id)
+        yield report
@@ -0,0 +1,318 @@
+"""
+Per-organisation read-through response cache.
+
+Cached GET responses are keyed by (organisation_id, version, resource, params).
+Every organisation has a version counter that write handlers bump after they
+commit, so invalidating everything an organisation can read is a single
+increment; stale entries are never looked up again and simply age out.
+
+The version is read before the response is computed. A write that commits
+while a response is being built bumps the version past the key it will be
+stored under, so a stale body can never be served.
+
+Backends (none by default):
+- `MemoryBackend`: in-process LRU with TTL. Versions are per process, so
+  it is refused when several workers are configured (WEB_CONCURRENCY or
+  `--workers`).
+- `RedisBackend`: any Redis-protocol server (Redis, Valkey, KeyDB, or an
+  in-process stand-in such as fakeredis). Requires the optional `redis`
+  package unless a client is passed in.
+"""
+
+import hashlib
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Optional
+
+import orjson
+from fastapi.responses import Response
+
+from config import settings
+from services.conditional import Preconditions
+from services.metrics import RESPONSE_CACHE_REQUESTS
+
+try:
+    import redis
+except ImportError:  # redis is optional; only needed for CACHE_BACKEND=redis
+    redis = None
+
+# Response headers replayed on a cache hit
+_CACHED_HEADERS = ("content-type", "etag", "last-modified", "cache-control")
+
+
+class CacheBackend:
+    """Minimal key/value interface the response cache needs."""
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        raise NotImplementedError
+
+    def get_counter(self, key: str) -> int:
+        raise NotImplementedError
+
+    def incr(self, key: str) -> int:
+        raise NotImplementedError
+
+
+class MemoryBackend(CacheBackend):
+    """
+    Thread-safe in-process LRU cache with per-entry expiry.
+
+    Counters are kept apart from entries so LRU eviction can never reset an
+    organisation's version back to a value that still has entries stored.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_counter(self, key: str) -> int:
+        return self._counters.get(key, 0)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            value = self._counters.get(key, 0) + 1
+            self._counters[key] = value
+            return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._counters.clear()
+
+
+class RedisBackend(CacheBackend):
+    """
+    Redis-protocol backend shared by every worker.
+
+    Args:
+        url: Connection URL, used when no client is given
+        client: Any object with the redis-py `get`/`set`/`incr` API
+        prefix: Namespace for all keys written by this app
+    """
+
+    def __init__(self, url: Optional[str] = None, client=None, prefix: str = "lendinsure:"):
+        if client is None:
+            if redis is None:
+                raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package")
+            client = redis.Redis.from_url(url, socket_timeout=0.25)
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(self.prefix + key)
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        self.client.set(self.prefix + key, value, px=int(ttl * 1000))
+
+    def get_counter(self, key: str) -> int:
+        value = self.client.get(self.prefix + key)
+        return int(value) if value is not None else 0
+
+    def incr(self, key: str) -> int:
+        return int(self.client.incr(self.prefix + key))
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    headers: Dict[str, str]
+    etag: Optional[str]
+    last_modified: Optional[datetime]
+
+    def dumps(self) -> bytes:
+        meta = orjson.dumps({
+            "headers": self.headers,
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+        })
+        return meta + b"\n" + self.body
+
+    @classmethod
+    def loads(cls, raw: bytes) -> "CachedResponse":
+        meta, _, body = raw.partition(b"\n")
+        meta = orjson.loads(meta)
+        last_modified = meta["last_modified"]
+        return cls(
+            body=body,
+            headers=meta["headers"],
+            etag=meta["etag"],
+            last_modified=datetime.fromisoformat(last_modified) if last_modified else None,
+        )
+
+
+class ResponseCache:
+    """
+    Read-through cache for conditional GET responses.
+
+    Backend errors are counted and treated as misses so a cache outage only
+    costs latency, never availability.
+    """
+
+    def __init__(self, backend: Optional[CacheBackend], ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    def _version_key(self, organisation_id) -> str:
+        return f"v:{organisation_id}"
+
+    def version(self, organisation_id) -> int:
+        return self.backend.get_counter(self._version_key(organisation_id))
+
+    def invalidate(self, organisation_id) -> None:
+        """Bump the organisation's version; call after a write commits."""
+        if not self.enabled:
+            return
+        try:
+            self.backend.incr(self._version_key(organisation_id))
+        except Exception:
+            # Entries still expire after CACHE_TTL_SECONDS
+            RESPONSE_CACHE_REQUESTS.labels("invalidate", "error").inc()
+
+    def key(self, organisation_id, resource: str, params: tuple) -> str:
+        digest = hashlib.blake2b(repr(params).encode(), digest_size=12).hexdigest()
+        return f"r:{organisation_id}:{self.version(organisation_id)}:{resource}:{digest}"
+
+    def respond(
+        self,
+        preconditions: Preconditions,
+        organisation_id,
+        resource: str,
+        params: tuple,
+        load: Callable[[Preconditions], Response],
+        ttl: Optional[float] = None,
+    ) -> Response:
+        """
+        Serve a GET from cache, falling back to `load`.
+
+        Args:
+            preconditions: The request's conditional headers
+            organisation_id: Organisation the response is scoped to
+            resource: Name of the endpoint, e.g. "clients:list"
+            params: Everything else that shapes the body (ids, paging, fields)
+            load: Builds the response for the given preconditions
+            ttl: Seconds to keep the response; defaults to CACHE_TTL_SECONDS
+        """
+        if not self.enabled:
+            return load(preconditions)
+
+        try:
+            key = self.key(organisation_id, resource, params)
+            raw = self.backend.get(key)
+        except Exception:
+            RESPONSE_CACHE_REQUESTS.labels(resource, "error").inc()
+            return load(preconditions)
+
+        if raw is not None:
+            RESPONSE_CACHE_REQUESTS.labels(resource, "hit").inc()
+            return self._replay(CachedResponse.loads(raw), preconditions, "HIT")
+
+        RESPONSE_CACHE_REQUESTS.labels(resource, "miss").inc()
+        # Build the full body even if the client's validators match, so the
+        # next request for this key is a hit
+        response = load(Preconditions())
+        if response.status_code != 200:
+            return response
+
+        entry = CachedResponse(
+            body=response.body,
+            headers={
+                name: response.headers[name]
+                for name in _CACHED_HEADERS if name in response.headers
+            },
+            etag=response.headers.get("etag"),
+            last_modified=(
+                parsedate_to_datetime(response.headers["last-modified"])
+                if "last-modified" in response.headers else None
+            ),
+        )
+        try:
+            self.backend.set(key, entry.dumps(), ttl or self.ttl)
+        except Exception:
+            RESPONSE_CACHE_REQUESTS.labels(resource, "error").inc()
+        return self._replay(entry, preconditions, "MISS")
+
+    def _replay(self, entry: CachedResponse, preconditions: Preconditions, status: str) -> Response:
+        headers = dict(entry.headers)
+        headers["X-Cache"] = status
+        if entry.etag and preconditions.not_modified(entry.etag, entry.last_modified):
+            headers.pop("content-type", None)
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.body, headers=headers)
+
+
+def configured_workers() -> int:
+    """
+    Worker processes the server was started with, from WEB_CONCURRENCY or a
+    `--workers` argument (worker processes inherit the parent's argv).
+    """
+    workers = os.environ.get("WEB_CONCURRENCY")
+    argv = sys.argv
+    for i, arg in enumerate(argv):
+        if arg == "--workers" and i + 1 < len(argv):
+            workers = argv[i + 1]
+        elif arg.startswith("--workers="):
+            workers = arg.split("=", 1)[1]
+    try:
+        return int(workers) if workers else 1
+    except ValueError:
+        return 1
+
+
+def create_backend() -> Optional[CacheBackend]:
+    """
+    Build the backend selected by CACHE_BACKEND (memory, redis or none).
+
+    Raises:
+        RuntimeError: memory selected with more than one worker, where each
+            worker would serve its own stale copies of other workers' writes
+    """
+    backend = settings.CACHE_BACKEND.lower()
+    if backend == "memory":
+        if configured_workers() > 1:
+            raise RuntimeError(
+                "CACHE_BACKEND=memory only works with a single worker; "
+                "use CACHE_BACKEND=redis or none"
+            )
+        return MemoryBackend(settings.CACHE_MAX_ENTRIES)
+    if backend == "redis":
+        return RedisBackend(settings.CACHE_REDIS_URL)
+    if backend == "none":
+        return None
+    raise ValueError(f"Unknown CACHE_BACKEND: {settings.CACHE_BACKEND}")
+
+
+response_cache = ResponseCache(create_backend(), settings.CACHE_TTL_SECONDS)
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Broker commission batch.
+
+Every agreement that has been signed or activated earns one BROKER_FEE
+commission line of `principal_amount_pennies * broker_fee_bps / 10000`
+(rounded half up), dated by when it was signed (or activated if it has no
+signing date). Lines are written by a single `INSERT ... SELECT ... ON
+CONFLICT DO NOTHING`, so a run costs one statement however many agreements
+it covers, and reruns never duplicate a line.
+
+New lines invalidate the organisations' cached commission reports in every
+API worker (`notify_invalidation`), not just in the process running the batch.
+
+Incremental runs only look at agreements updated since the previous run's
+watermark (stored in `job_watermarks`), minus a small overlap so rows from
+transactions that committed late are not skipped. Pass --since/--until to
+(re)compute a specific period instead; that leaves the watermark alone.
+
+Usage:
+    python -m services.commission [--since YYYY-MM-DD] [--until YYYY-MM-DD]
+"""
+
+import argparse
+from datetime import date, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import text
+
+from database import SessionLocal
+from services.audit_sink import audit_sink
+from services.cache import response_cache
+from services.outbox import notify_invalidation
+
+JOB_NAME = "commission_lines"
+LINE_TYPE = "BROKER_FEE"
+# Re-scan this far behind the watermark; ON CONFLICT makes the overlap free
+WATERMARK_OVERLAP = timedelta(minutes=5)
+# Arbitrary constant so concurrent runs do not race each other
+_LOCK_KEY = 0x636F6D6D
+
+_INSERT_LINES = """
+    WITH inserted AS (
+        INSERT INTO commission_lines
+            (id, organisation_id, agreement_id, type, amount_pennies, currency, earned_at, calculated_at)
+        SELECT gen_random_uuid(), a.organisation_id, a.id, :type,
+               (a.principal_amount_pennies::bigint * a.broker_fee_bps + 5000) / 10000,
+               'GBP', COALESCE(a.signed_at, a.activated_at), now()
+        FROM agreements a
+        WHERE a.status IN ('SIGNED', 'ACTIVE', 'DEFAULTED', 'TERMINATED')
+          AND COALESCE(a.signed_at, a.activated_at) IS NOT NULL
+          AND {window}
+        ON CONFLICT (agreement_id, type) DO NOTHING
+        RETURNING organisation_id, amount_pennies
+    )
+    SELECT organisation_id, count(*) AS lines, sum(amount_pennies) AS amount_pennies
+    FROM inserted
+    GROUP BY organisation_id
+"""
+
+
+def run(since: Optional[date] = None, until: Optional[date] = None) -> Optional[Dict[str, int]]:
+    """
+    Compute commission lines in one transaction.
+
+    Args:
+        since, until: Only agreements earned in [since, until); when omitted,
+            run incrementally from the watermark and advance it
+
+    Returns:
+        Lines inserted and their total, or None if another run holds the lock
+    """
+    with SessionLocal() as db:
+        if not db.execute(text("SELECT pg_try_advisory_xact_lock(:k)"), {"k": _LOCK_KEY}).scalar():
+            return None
+
+        # Transaction start time: everything committed before it is visible
+        started_at = db.execute(text("SELECT now()")).scalar()
+        params = {"type": LINE_TYPE}
+        if since is None and until is None:
+            watermark = db.execute(
+                text("SELECT watermark FROM job_watermarks WHERE name = :name"), {"name": JOB_NAME}
+            ).scalar()
+            if watermark is None:
+                window = "TRUE"
+            else:
+                window = "a.updated_at > :after"
+                params["after"] = watermark - WATERMARK_OVERLAP
+        else:
+            window = "COALESCE(a.signed_at, a.activated_at) >= :since AND COALESCE(a.signed_at, a.activated_at) < :until"
+            params["since"] = since or date.min
+            params["until"] = until or date.max
+
+        rows = db.execute(text(_INSERT_LINES.format(window=window)), params).all()
+
+        if since is None and until is None:
+            db.execute(text("""
+                INSERT INTO job_watermarks (name, watermark, updated_at)
+                VALUES (:name, :watermark, now())
+                ON CONFLICT (name) DO UPDATE SET watermark = EXCLUDED.watermark, updated_at = now()
+            """), {"name": JOB_NAME, "watermark": started_at})
+
+        if rows:
+            audit_sink.record_many(db, [
+                {
+                    "organisation_id": row.organisation_id,
+                    "actor_type": "SYSTEM",
+                    "action": "CALCULATE",
+                    "entity": "COMMISSION",
+                    "after": {"lines": row.lines, "amount_pennies": int(row.amount_pennies)},
+                }
+                for row in rows
+            ])
+            # The API workers' caches, not just this process's
+            notify_invalidation(db, [row.organisation_id for row in rows])
+        db.commit()
+
+    for row in rows:
+        response_cache.invalidate(str(row.organisation_id))
+    return {
+        "lines": sum(row.lines for row in rows),
+        "amount_pennies": sum(int(row.amount_pennies) for row in rows),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--since", type=date.fromisoformat, help="First day of the period (YYYY-MM-DD)")
+    parser.add_argument("--until", type=date.fromisoformat, help="Day after the period (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    result = run(args.since, args.until)
+    if result is None:
+        print("another run holds the lock; nothing done")
+        return
+    print(f"{result['lines']} commission lines, {result['amount_pennies']} pennies")
+
+
+if __name__ == "__main__":
+    main()
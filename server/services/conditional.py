@@ -0,0 +1,174 @@
+"""
+Conditional GET support (ETag / Last-Modified) backed by `updated_at`.
+
+Detail tags are derived from the row's id and `updated_at`, or for versioned
+models (agreements) are the strong `version` tag that `If-Match` expects, so a
+client can send back the ETag it was given. List tags come from a single
+`count(*), max(updated_at)` aggregate over the same filters, plus the paging
+and fieldset parameters. When the client's validator still matches we answer
+304 before the page is fetched or anything is serialized.
+"""
+
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Callable, Optional
+
+from fastapi import Header
+from fastapi.responses import Response
+from sqlalchemy import func
+
+from services.serialization import json_response, row_to_dict
+
+# Labels for the extra validator columns selected by detail queries
+_VALIDATOR_COLUMN = "_updated_at"
+_VERSION_COLUMN = "_version"
+
+
+def make_etag(*parts) -> str:
+    """Build a weak ETag from the given parts."""
+    digest = hashlib.blake2b("|".join(str(p) for p in parts).encode(), digest_size=16)
+    return f'W/"{digest.hexdigest()}"'
+
+
+def version_etag(version: int, *params) -> str:
+    """
+    Build a strong ETag from a row version. Representations shaped by
+    `params` (sparse fields) get a suffix so they never share a tag with the
+    full one; `parse_version_etag` ignores it.
+    """
+    if any(p is not None for p in params):
+        digest = hashlib.blake2b("|".join(str(p) for p in params).encode(), digest_size=4)
+        return f'"{version}.{digest.hexdigest()}"'
+    return f'"{version}"'
+
+
+def parse_version_etag(tag: str) -> int:
+    """
+    Row version from a tag built by `version_etag`.
+
+    Raises:
+        ValueError: if the tag is weak or not a version tag
+    """
+    if tag.startswith("W/") or not (len(tag) >= 2 and tag[0] == tag[-1] == '"'):
+        raise ValueError(tag)
+    return int(tag[1:-1].split(".", 1)[0])
+
+
+def _to_http_date(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def _strip_weak(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+@dataclass
+class Preconditions:
+    """Conditional request headers sent by the client."""
+    if_none_match: Optional[str] = None
+    if_modified_since: Optional[str] = None
+
+    def not_modified(self, etag: str, last_modified: Optional[datetime]) -> bool:
+        """
+        Evaluate If-None-Match (weak comparison), falling back to
+        If-Modified-Since only when no If-None-Match was sent (RFC 7232).
+        """
+        if self.if_none_match:
+            if self.if_none_match.strip() == "*":
+                return True
+            wanted = _strip_weak(etag)
+            return any(_strip_weak(tag) == wanted for tag in self.if_none_match.split(","))
+        if self.if_modified_since and last_modified is not None:
+            try:
+                since = parsedate_to_datetime(self.if_modified_since)
+            except (TypeError, ValueError):
+                return False
+            if last_modified.tzinfo is None:
+                last_modified = last_modified.replace(tzinfo=timezone.utc)
+            return last_modified.replace(microsecond=0) <= since
+        return False
+
+
+def get_preconditions(
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None),
+) -> Preconditions:
+    """Dependency exposing the request's conditional headers."""
+    return Preconditions(if_none_match=if_none_match, if_modified_since=if_modified_since)
+
+
+def validator_headers(etag: str, last_modified: Optional[datetime]) -> dict:
+    headers = {
+        "ETag": etag,
+        # Authenticated data: browsers may store it but must revalidate
+        "Cache-Control": "private, no-cache",
+    }
+    if last_modified is not None:
+        headers["Last-Modified"] = _to_http_date(last_modified)
+    return headers
+
+
+def conditional_response(
+    preconditions: Preconditions,
+    etag: str,
+    last_modified: Optional[datetime],
+    build: Callable[[], object],
+) -> Response:
+    """
+    Return 304 if the client's validators match, otherwise a 200 JSON response.
+
+    Args:
+        preconditions: The request's conditional headers
+        etag: Current ETag of the resource
+        last_modified: Current Last-Modified of the resource, if known
+        build: Produces the response content; only called on a 200
+    """
+    headers = validator_headers(etag, last_modified)
+    if preconditions.not_modified(etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    return json_response(build(), headers=headers)
+
+
+def validator_column(model):
+    """Extra column for detail selects so the ETag is available even when a
+    sparse fieldset omits `updated_at`."""
+    return model.updated_at.label(_VALIDATOR_COLUMN)
+
+
+def version_column(model):
+    """Extra column for detail selects of models with a `version`, whose
+    ETag is then `version_etag` rather than a hash."""
+    return model.version.label(_VERSION_COLUMN)
+
+
+def detail_response(preconditions: Preconditions, row, *params) -> Response:
+    """
+    Conditional response for a detail row selected with `validator_column`
+    (and `version_column` for versioned models). `params` should hold
+    anything else that shapes the body (sparse fields).
+    """
+    content = row_to_dict(row)
+    last_modified = content.pop(_VALIDATOR_COLUMN)
+    if _VERSION_COLUMN in content:
+        etag = version_etag(content.pop(_VERSION_COLUMN), *params)
+    else:
+        etag = make_etag(content["id"], last_modified, *params)
+    return conditional_response(preconditions, etag, last_modified, lambda: content)
+
+
+def list_validators(query, model, *params) -> tuple:
+    """
+    Compute (total, last_modified, etag) for a filtered list query in one
+    aggregate statement. `params` should hold everything else that shapes the
+    response body (paging, sparse fields, filters).
+    """
+    total, last_modified = query.with_entities(
+        func.count(model.id), func.max(model.updated_at)
+    ).one()
+    etag = make_etag(model.__tablename__, total, last_modified, *params)
+    return total, last_modified, etag
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Idempotency keys for create endpoints.
+
+A client that may retry a POST sends a unique `Idempotency-Key` header. The
+first request claims the key by inserting an `idempotency_keys` row in its own
+transaction, runs normally, and stores its response in that row before
+committing, so the entity and the stored response commit (or roll back)
+together. Failed requests store nothing and can be retried.
+
+Repeats within IDEMPOTENCY_KEY_TTL_SECONDS are answered from the row without
+running the handler:
+
+- a completed key is found by a plain indexed SELECT, so retry storms cost
+  one read each and take no locks;
+- a repeat that arrives while the first request is still running blocks on
+  the first request's uncommitted row (the claim is an INSERT ... ON
+  CONFLICT) and replays its response once it commits;
+- reusing a key for a different request body or endpoint is rejected with
+  422, so a key cannot replay the wrong response.
+
+Expired keys are reclaimed by the next request that uses them; delete them in
+bulk daily:
+
+Usage:
+    python -m services.idempotency
+"""
+
+import argparse
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from fastapi import Header, HTTPException, Request
+from fastapi.responses import Response
+from pydantic import BaseModel
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import SessionLocal
+from models import IdempotencyKey
+from services.serialization import json_response
+
+MAX_KEY_LENGTH = 255
+# Rows deleted per statement when purging
+_PURGE_BATCH_SIZE = 10000
+
+
+@dataclass
+class Idempotency:
+    """A request's Idempotency-Key, if it sent one."""
+    key: Optional[str]
+    method: str
+    path: str
+    organisation_id: Optional[str] = None
+
+    def fingerprint(self, payload: BaseModel) -> str:
+        digest = hashlib.sha256(f"{self.method} {self.path}\n".encode())
+        digest.update(payload.model_dump_json().encode())
+        return digest.hexdigest()
+
+    def _replay(self, row, fingerprint: str) -> Response:
+        if row.fingerprint != fingerprint:
+            raise HTTPException(
+                status_code=422,
+                detail="Idempotency-Key was already used for a different request"
+            )
+        return json_response(
+            row.response, status_code=row.status_code, headers={"Idempotent-Replayed": "true"}
+        )
+
+    def begin(self, db: Session, organisation_id: str, payload: BaseModel) -> Optional[Response]:
+        """
+        Claim the key in `db`'s transaction, or return the stored response.
+
+        Returns:
+            None when the handler should run (no key, new key or expired key),
+            otherwise the replayed response
+
+        Raises:
+            HTTPException: 422 if the key was used for a different request
+        """
+        if self.key is None:
+            return None
+        self.organisation_id = organisation_id
+        fingerprint = self.fingerprint(payload)
+
+        # Fast path: a completed, unexpired key is a plain read
+        row = db.execute(
+            select(IdempotencyKey.fingerprint, IdempotencyKey.status_code, IdempotencyKey.response)
+            .where(
+                IdempotencyKey.organisation_id == organisation_id,
+                IdempotencyKey.key == self.key,
+                IdempotencyKey.expires_at > func.now(),
+                IdempotencyKey.status_code.is_not(None),
+            )
+        ).first()
+        if row is not None:
+            return self._replay(row, fingerprint)
+
+        # Claim the key. A concurrent first request's uncommitted row makes
+        # this wait for it; an expired row is taken over and locked.
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL_SECONDS)
+        stmt = pg_insert(IdempotencyKey).values(
+            organisation_id=organisation_id,
+            key=self.key,
+            fingerprint=fingerprint,
+            expires_at=expires_at,
+        )
+        claimed = db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[IdempotencyKey.organisation_id, IdempotencyKey.key],
+                set_={
+                    "fingerprint": stmt.excluded.fingerprint,
+                    "status_code": None,
+                    "response": None,
+                    "created_at": func.now(),
+                    "expires_at": stmt.excluded.expires_at,
+                },
+                where=IdempotencyKey.expires_at <= func.now(),
+            ).returning(IdempotencyKey.id)
+        ).first()
+        if claimed is not None:
+            return None
+
+        # Someone else's committed, unexpired request
+        row = db.execute(
+            select(IdempotencyKey.fingerprint, IdempotencyKey.status_code, IdempotencyKey.response)
+            .where(IdempotencyKey.organisation_id == organisation_id, IdempotencyKey.key == self.key)
+        ).one()
+        return self._replay(row, fingerprint)
+
+    def store(self, db: Session, response: BaseModel, status_code: int = 200) -> BaseModel:
+        """Record the response in the claimed row before the handler commits."""
+        if self.key is not None:
+            db.execute(
+                IdempotencyKey.__table__.update()
+                .where(
+                    IdempotencyKey.organisation_id == self.organisation_id,
+                    IdempotencyKey.key == self.key,
+                )
+                .values(status_code=status_code, response=response.model_dump(mode="json"))
+            )
+        return response
+
+
+def get_idempotency(
+    request: Request,
+    idempotency_key: Optional[str] = Header(None),
+) -> Idempotency:
+    """
+    Dependency exposing the request's Idempotency-Key.
+
+    Raises:
+        HTTPException: 400 if the key is empty or too long
+    """
+    if idempotency_key is not None and not 0 < len(idempotency_key) <= MAX_KEY_LENGTH:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters"
+        )
+    return Idempotency(key=idempotency_key, method=request.method, path=request.url.path)
+
+
+def purge_expired() -> int:
+    """Delete expired keys in batches; returns the number deleted."""
+    deleted = 0
+    with SessionLocal() as db:
+        while True:
+            batch = (
+                select(IdempotencyKey.id)
+                .where(IdempotencyKey.expires_at <= func.now())
+                .limit(_PURGE_BATCH_SIZE)
+            )
+            count = db.execute(delete(IdempotencyKey).where(IdempotencyKey.id.in_(batch))).rowcount
+            db.commit()
+            deleted += count
+            if count < _PURGE_BATCH_SIZE:
+                return deleted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.parse_args()
+    print(f"{purge_expired()} expired idempotency keys deleted")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Instalment and agreement status engine.
+
+Each sweep:
+
+- marks UPCOMING instalments of ACTIVE/DEFAULTED agreements as MISSED once
+  their due date is more than INSTALMENT_GRACE_DAYS in the past, in batches
+  of INSTALMENT_SWEEP_BATCH_SIZE rows per UPDATE (served by
+  idx_instalments_status_due_date);
+- promotes ACTIVE agreements to DEFAULTED when they have at least
+  AGREEMENT_DEFAULT_MISSED_INSTALMENTS missed instalments, or their oldest
+  missed instalment is more than AGREEMENT_DEFAULT_DAYS_PAST_DUE days old
+  (0 disables a rule).
+
+Transitions are audited in bulk (one row per agreement per batch, actor
+`SYSTEM`). Defaults also write agreement events for the outbox, and missed
+instalments notify the API workers to drop cached reports. Every UPDATE is
+guarded by the current status, so rerunning a sweep is a no-op; a
+session-level advisory lock keeps concurrent sweeps (cron plus several API
+workers) from duplicating work, and `SKIP LOCKED` keeps a sweep from waiting
+on rows a request is updating.
+
+Run from cron with `python -m services.instalment_status`, or in-process by
+setting INSTALMENT_SWEEP_INTERVAL_SECONDS.
+"""
+
+import argparse
+import asyncio
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import SessionLocal, engine
+from services.audit_sink import audit_sink
+from services.cache import response_cache
+from services.outbox import notify_invalidation, record_events
+
+ACTOR = "SYSTEM"
+# Arbitrary constant so concurrent sweeps do not race each other
+_LOCK_KEY = 0x696E7374
+
+_MARK_MISSED = text("""
+    WITH due AS (
+        SELECT i.id, a.organisation_id
+        FROM instalments i
+        JOIN agreements a ON a.id = i.agreement_id
+        WHERE i.status = 'UPCOMING'
+          AND i.due_date < :cutoff
+          AND a.status IN ('ACTIVE', 'DEFAULTED')
+        LIMIT :batch_size
+        FOR UPDATE OF i SKIP LOCKED
+    )
+    UPDATE instalments i
+    SET status = 'MISSED', updated_at = now()
+    FROM due
+    WHERE i.id = due.id
+    RETURNING i.id, i.agreement_id, due.organisation_id
+""")
+
+_MARK_DEFAULTED = text("""
+    WITH arrears AS (
+        -- Only ACTIVE agreements can default, so DEFAULTED/TERMINATED
+        -- history never enters the aggregate
+        SELECT i.agreement_id, count(*) AS missed, min(i.due_date) AS oldest_due
+        FROM instalments i
+        JOIN agreements a ON a.id = i.agreement_id
+        WHERE i.status = 'MISSED'
+          AND a.status = 'ACTIVE'
+        GROUP BY i.agreement_id
+    ),
+    due AS (
+        SELECT a.id, r.missed, r.oldest_due
+        FROM agreements a
+        JOIN arrears r ON r.agreement_id = a.id
+        WHERE a.status = 'ACTIVE'
+          AND ((:min_missed > 0 AND r.missed >= :min_missed)
+               OR (:days_past_due > 0 AND r.oldest_due < :oldest_cutoff))
+        FOR UPDATE OF a SKIP LOCKED
+    )
+    UPDATE agreements a
+    SET status = 'DEFAULTED', version = a.version + 1, updated_at = now()
+    FROM due
+    WHERE a.id = due.id
+    RETURNING a.id, a.organisation_id, due.missed, due.oldest_due
+""")
+
+
+def mark_missed(db: Session, cutoff: date, batch_size: int) -> List:
+    """
+    Mark one batch of overdue instalments MISSED, audit it, and invalidate
+    the affected organisations' cached reports in every API worker.
+
+    Returns:
+        (id, agreement_id, organisation_id) rows updated; fewer than
+        `batch_size` means the backlog is done
+    """
+    rows = db.execute(_MARK_MISSED, {"cutoff": cutoff, "batch_size": batch_size}).all()
+    by_agreement: Dict[tuple, List[str]] = defaultdict(list)
+    for row in rows:
+        by_agreement[(row.organisation_id, row.agreement_id)].append(str(row.id))
+    if by_agreement:
+        audit_sink.record_many(db, [
+            {
+                "organisation_id": organisation_id,
+                "actor_type": ACTOR,
+                "action": "INSTALMENTS_MISSED",
+                "entity": "AGREEMENT",
+                "after": {"agreement_id": str(agreement_id), "instalment_ids": ids},
+            }
+            for (organisation_id, agreement_id), ids in by_agreement.items()
+        ])
+        # Arrears and cash flow change without an agreement event
+        notify_invalidation(db, {organisation_id for organisation_id, _ in by_agreement})
+    return rows
+
+
+def mark_defaulted(db: Session, min_missed: int, days_past_due: int, today: date) -> List:
+    """
+    Promote ACTIVE agreements that meet an arrears rule to DEFAULTED.
+
+    Returns:
+        (id, organisation_id, missed, oldest_due) rows for promoted agreements
+    """
+    rows = db.execute(_MARK_DEFAULTED, {
+        "min_missed": min_missed,
+        "days_past_due": days_past_due,
+        "oldest_cutoff": today - timedelta(days=days_past_due),
+    }).all()
+    if rows:
+        record_events(db, [
+            {
+                "organisation_id": row.organisation_id,
+                "agreement_id": row.id,
+                "type": "STATUS_CHANGED",
+                "actor_type": ACTOR,
+                "meta": {"from": "ACTIVE", "to": "DEFAULTED"},
+            }
+            for row in rows
+        ])
+        audit_sink.record_many(db, [
+            {
+                "organisation_id": row.organisation_id,
+                "actor_type": ACTOR,
+                "action": "DEFAULT",
+                "entity": "AGREEMENT",
+                "before": {"id": str(row.id), "status": "ACTIVE"},
+                "after": {
+                    "id": str(row.id),
+                    "status": "DEFAULTED",
+                    "missed_instalments": row.missed,
+                    "oldest_missed_due_date": row.oldest_due.isoformat(),
+                },
+            }
+            for row in rows
+        ])
+    return rows
+
+
+def sweep(
+    batch_size: int = None,
+    grace_days: int = None,
+    min_missed: int = None,
+    days_past_due: int = None,
+    today: date = None,
+) -> Optional[dict]:
+    """
+    Run one full sweep; arguments default to the settings.
+
+    Each batch commits on its own, so a sweep over a large backlog never holds
+    row locks for long and an interrupted sweep resumes where it stopped.
+
+    Returns:
+        Counts of instalments marked MISSED and agreements DEFAULTED, or None
+        if another sweep holds the lock
+    """
+    batch_size = batch_size or settings.INSTALMENT_SWEEP_BATCH_SIZE
+    grace_days = settings.INSTALMENT_GRACE_DAYS if grace_days is None else grace_days
+    min_missed = settings.AGREEMENT_DEFAULT_MISSED_INSTALMENTS if min_missed is None else min_missed
+    days_past_due = settings.AGREEMENT_DEFAULT_DAYS_PAST_DUE if days_past_due is None else days_past_due
+    today = today or datetime.now(timezone.utc).date()
+
+    with engine.connect() as lock_conn:
+        if not lock_conn.execute(text("SELECT pg_try_advisory_lock(:k)"), {"k": _LOCK_KEY}).scalar():
+            return None
+        try:
+            missed = 0
+            touched = set()
+            cutoff = today - timedelta(days=grace_days)
+            while True:
+                with SessionLocal() as db:
+                    rows = mark_missed(db, cutoff, batch_size)
+                    db.commit()
+                missed += len(rows)
+                touched.update(row.organisation_id for row in rows)
+                if len(rows) < batch_size:
+                    break
+
+            with SessionLocal() as db:
+                defaulted = mark_defaulted(db, min_missed, days_past_due, today)
+                db.commit()
+            touched.update(row.organisation_id for row in defaulted)
+        finally:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": _LOCK_KEY})
+            lock_conn.commit()
+
+    # Statuses show up in cached agreement responses and reports
+    for organisation_id in touched:
+        response_cache.invalidate(str(organisation_id))
+    return {"instalments_missed": missed, "agreements_defaulted": len(defaulted)}
+
+
+class InstalmentStatusScheduler:
+    """
+    Runs `sweep` on a background task every `interval` seconds.
+
+    Every API worker may run one; the advisory lock means only one sweeps at
+    a time and the rest return immediately.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                # Blocking driver, so keep the sweep off the event loop
+                await asyncio.to_thread(sweep)
+            except Exception:
+                # A failed sweep (e.g. database restart) is retried next interval
+                pass
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+instalment_scheduler = InstalmentStatusScheduler(settings.INSTALMENT_SWEEP_INTERVAL_SECONDS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--today", type=date.fromisoformat, help="Sweep as of this date (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    result = sweep(today=args.today)
+    if result is None:
+        print("another sweep holds the lock; nothing done")
+        return
+    print(f"{result['instalments_missed']} instalments marked MISSED")
+    print(f"{result['agreements_defaulted']} agreements marked DEFAULTED")
+
+
+if __name__ == "__main__":
+    main()
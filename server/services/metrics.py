@@ -0,0 +1,482 @@
+"""
+In-process metrics registry with Prometheus text exposition.
+
+Observations are plain attribute updates on pre-bound children, with no locks
+and no allocation on the hot path, so recording a sample costs a few hundred
+nanoseconds. Increments from concurrent threads may very occasionally race;
+that trade-off is deliberate for monitoring data.
+
+Multiple uvicorn workers:
+    Set METRICS_MULTIPROC_DIR to a directory shared by all workers. Each worker
+    periodically snapshots its registry to `metrics-<pid>.json` in that
+    directory, and `/metrics` merges every snapshot. Counters and histograms
+    are summed across all files (including exited workers, so totals never go
+    backwards); gauges are summed across live workers only.
+"""
+
+import json
+import os
+import threading
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class _GaugeChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class _HistogramChild:
+    __slots__ = ("_bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self._bounds = bounds
+        # One slot per finite bucket plus a trailing +Inf slot (non-cumulative)
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self._bounds, value)] += 1
+        self.sum += value
+
+
+class _Metric:
+    """Base class for a named metric family with optional labels."""
+
+    type_name = ""
+    _child_class = None
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        if not self.labelnames:
+            self._default = self._new_child()
+            self._children[()] = self._default
+
+    def _new_child(self):
+        return self._child_class()
+
+    def labels(self, *values: str):
+        """
+        Return the child for the given label values, creating it on first use.
+
+        Callers on hot paths should bind children once and reuse them.
+        """
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(
+                    f"{self.name} expects labels {self.labelnames}, got {values}"
+                )
+            child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _samples(self) -> List[list]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    type_name = "counter"
+    _child_class = _CounterChild
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.value += amount
+
+    def _samples(self) -> List[list]:
+        return [[list(k), c.value] for k, c in list(self._children.items())]
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+    _child_class = _GaugeChild
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._default.value -= amount
+
+    def set(self, value: float) -> None:
+        self._default.value = value
+
+    def _samples(self) -> List[list]:
+        return [[list(k), c.value] for k, c in list(self._children.items())]
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ):
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default.observe(value)
+
+    def _samples(self) -> List[list]:
+        return [
+            [list(k), {"counts": list(c.counts), "sum": c.sum}]
+            for k, c in list(self._children.items())
+        ]
+
+
+class Registry:
+    """A collection of metric families that can be rendered or snapshotted."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def snapshot(self) -> dict:
+        """Return a JSON-serialisable copy of every metric's current values."""
+        result = {}
+        for metric in list(self._metrics.values()):
+            entry = {
+                "type": metric.type_name,
+                "help": metric.documentation,
+                "labelnames": list(metric.labelnames),
+                "samples": metric._samples(),
+            }
+            if isinstance(metric, Histogram):
+                entry["buckets"] = list(metric.buckets)
+            result[metric.name] = entry
+        return result
+
+
+# ============================================================================
+# Exposition
+# ============================================================================
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def render(snapshot: dict) -> str:
+    """Render a registry snapshot in the Prometheus text exposition format."""
+    lines = []
+    for name, entry in snapshot.items():
+        labelnames = entry["labelnames"]
+        lines.append(f"# HELP {name} {entry['help']}")
+        lines.append(f"# TYPE {name} {entry['type']}")
+        for labelvalues, value in entry["samples"]:
+            if entry["type"] != "histogram":
+                lines.append(f"{name}{_format_labels(labelnames, labelvalues)} {_format_value(value)}")
+                continue
+            cumulative = 0
+            bounds = list(entry["buckets"]) + [float("inf")]
+            for bound, count in zip(bounds, value["counts"]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{name}_bucket{_format_labels(labelnames, labelvalues, le)} {cumulative}"
+                )
+            lines.append(f"{name}_sum{_format_labels(labelnames, labelvalues)} {_format_value(value['sum'])}")
+            lines.append(f"{name}_count{_format_labels(labelnames, labelvalues)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+# ============================================================================
+# Multiprocess aggregation
+# ============================================================================
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def merge_snapshots(snapshots: Iterable[Tuple[int, dict]]) -> dict:
+    """
+    Merge per-process snapshots into one.
+
+    Counters and histograms are summed across every snapshot; gauges are summed
+    across snapshots whose process is still alive.
+    """
+    merged: Dict[str, dict] = {}
+    for pid, snapshot in snapshots:
+        alive = None
+        for name, entry in snapshot.items():
+            if entry["type"] == "gauge":
+                if alive is None:
+                    alive = _pid_alive(pid)
+                if not alive:
+                    continue
+            target = merged.setdefault(name, {**entry, "samples": {}})
+            for labelvalues, value in entry["samples"]:
+                key = tuple(labelvalues)
+                current = target["samples"].get(key)
+                if current is None:
+                    if entry["type"] == "histogram":
+                        value = {"counts": list(value["counts"]), "sum": value["sum"]}
+                    target["samples"][key] = value
+                elif entry["type"] == "histogram":
+                    current["counts"] = [a + b for a, b in zip(current["counts"], value["counts"])]
+                    current["sum"] += value["sum"]
+                else:
+                    target["samples"][key] = current + value
+    for entry in merged.values():
+        entry["samples"] = [[list(k), v] for k, v in entry["samples"].items()]
+    return merged
+
+
+class MultiprocessWriter:
+    """Background thread that periodically writes this worker's snapshot to disk."""
+
+    def __init__(self, registry: Registry, directory: str, interval: float):
+        self.registry = registry
+        self.directory = directory
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.directory, f"metrics-{os.getpid()}.json")
+
+    def write(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as fh:
+            json.dump(self.registry.snapshot(), fh)
+        os.replace(tmp, self.path)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.write()
+            except OSError:
+                pass
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="metrics-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval)
+            self._thread = None
+        self.write()
+
+
+def read_snapshots(directory: str) -> List[Tuple[int, dict]]:
+    """Load every worker snapshot from a multiprocess directory."""
+    snapshots = []
+    for filename in os.listdir(directory):
+        if not (filename.startswith("metrics-") and filename.endswith(".json")):
+            continue
+        try:
+            pid = int(filename[len("metrics-"):-len(".json")])
+            with open(os.path.join(directory, filename)) as fh:
+                snapshots.append((pid, json.load(fh)))
+        except (ValueError, OSError):
+            continue
+    return snapshots
+
+
+# ============================================================================
+# Application metrics
+# ============================================================================
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template.",
+    ("method", "route"),
+)
+HTTP_REQUESTS = REGISTRY.counter(
+    "http_requests_total",
+    "HTTP responses by route template and status code.",
+    ("method", "route", "status"),
+)
+HTTP_REQUESTS_IN_FLIGHT = REGISTRY.gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being served.",
+)
+HTTP_EXCEPTIONS = REGISTRY.counter(
+    "http_exceptions_total",
+    "Unhandled exceptions raised while serving a request.",
+    ("route", "exception"),
+)
+DB_POOL_CHECKOUTS = REGISTRY.counter(
+    "db_pool_checkouts_total",
+    "Connections checked out of the SQLAlchemy pool.",
+)
+DB_POOL_CHECKED_OUT = REGISTRY.gauge(
+    "db_pool_checked_out",
+    "Connections currently checked out of the SQLAlchemy pool.",
+)
+DB_STATEMENTS = REGISTRY.counter(
+    "db_statements_total",
+    "SQL statements executed, by leading keyword.",
+    ("kind",),
+)
+AUTH_CACHE_REQUESTS = REGISTRY.counter(
+    "auth_cache_requests_total",
+    "Authentication cache lookups by cache and result (hit/miss).",
+    ("cache", "result"),
+)
+RESPONSE_CACHE_REQUESTS = REGISTRY.counter(
+    "response_cache_requests_total",
+    "Response cache lookups by resource and result (hit/miss/error).",
+    ("resource", "result"),
+)
+AUDIT_EVENTS = REGISTRY.counter(
+    "audit_events_total",
+    "Audit events by outcome (queued/batched/sync/failed).",
+    ("result",),
+)
+AUDIT_QUEUE_DEPTH = REGISTRY.gauge(
+    "audit_queue_depth",
+    "Audit events waiting for the background writer.",
+)
+AGREEMENT_EVENTS = REGISTRY.counter(
+    "agreement_events_total",
+    "Agreement events relayed from the outbox, by type.",
+    ("type",),
+)
+OUTBOX_SUBSCRIBER_ERRORS = REGISTRY.counter(
+    "outbox_subscriber_errors_total",
+    "Exceptions raised by outbox subscribers, by subscriber.",
+    ("subscriber",),
+)
+SSE_EVENTS_DROPPED = REGISTRY.counter(
+    "sse_events_dropped_total",
+    "Events not delivered to a server-sent event stream because its queue was full.",
+)
+
+_statement_children = {
+    kind: DB_STATEMENTS.labels(kind) for kind in ("SELECT", "INSERT", "UPDATE", "DELETE")
+}
+_cte_statements = DB_STATEMENTS.labels("WITH")
+_other_statements = DB_STATEMENTS.labels("OTHER")
+
+
+def instrument_engine(engine) -> None:
+    """Attach pool and statement listeners to a SQLAlchemy engine."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        DB_POOL_CHECKOUTS._default.value += 1
+        DB_POOL_CHECKED_OUT._default.value += 1
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        DB_POOL_CHECKED_OUT._default.value -= 1
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _on_execute(conn, cursor, statement, parameters, context, executemany):
+        head = statement.lstrip()[:6].upper()
+        child = _statement_children.get(head)
+        if child is None:
+            child = _cte_statements if head.startswith("WITH") else _other_statements
+        child.value += 1
+
+
+_writer: Optional[MultiprocessWriter] = None
+
+
+def start_multiprocess_writer(directory: Optional[str], interval: float) -> None:
+    """Begin snapshotting this worker's metrics when multiprocess mode is on."""
+    global _writer
+    if directory and _writer is None:
+        _writer = MultiprocessWriter(REGISTRY, directory, interval)
+        _writer.write()
+        _writer.start()
+
+
+def stop_multiprocess_writer() -> None:
+    global _writer
+    if _writer is not None:
+        _writer.stop()
+        _writer = None
+
+
+def generate_latest(directory: Optional[str] = None) -> str:
+    """Render current metrics, merging all workers when a directory is given."""
+    if not directory:
+        return render(REGISTRY.snapshot())
+    if _writer is not None:
+        _writer.write()
+    return render(merge_snapshots(read_snapshots(directory)))
@@ -0,0 +1,99 @@
+"""
+In-process cache of organisation records.
+
+Organisations are read on every authenticated request (suspension check),
+by `GET /api/broker/organisation` and by `/api/auth/me`, but only change in
+`update_organisation` and `signup_with_org`. Those handlers invalidate
+explicitly; the TTL bounds staleness for changes made by other workers or
+directly in the database.
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from config import settings
+from models import Organisation
+from schemas import OrganisationResponse
+from services.metrics import AUTH_CACHE_REQUESTS
+
+_hits = AUTH_CACHE_REQUESTS.labels("organisation", "hit")
+_misses = AUTH_CACHE_REQUESTS.labels("organisation", "miss")
+
+
+class OrganisationCache:
+    """
+    TTL + LRU cache of `OrganisationResponse` records keyed by organisation id.
+
+    Unknown ids are cached as None as well, so requests carrying a stale
+    organisation id do not query on every call.
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, organisation_id) -> Optional[OrganisationResponse]:
+        """
+        Return the organisation record, loading it on a miss.
+
+        Args:
+            db: Session used only when the record is not cached
+            organisation_id: Organisation UUID (str or UUID)
+
+        Returns:
+            The record, or None if the id is malformed or does not exist
+        """
+        key = str(organisation_id)
+        now = time.monotonic()
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None and item[0] > now:
+                self._entries.move_to_end(key)
+                _hits.value += 1
+                return item[1]
+
+        _misses.value += 1
+        record = self._load(db, key)
+        with self._lock:
+            self._entries[key] = (now + self.ttl, record)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return record
+
+    def _load(self, db: Session, key: str) -> Optional[OrganisationResponse]:
+        try:
+            organisation_id = uuid.UUID(key)
+        except ValueError:
+            return None
+        organisation = db.query(Organisation).filter(Organisation.id == organisation_id).first()
+        if organisation is None:
+            return None
+        return OrganisationResponse(
+            id=str(organisation.id),
+            name=organisation.name,
+            org_type=organisation.org_type,
+            status=organisation.status,
+            created_at=organisation.created_at,
+            updated_at=organisation.updated_at
+        )
+
+    def invalidate(self, organisation_id) -> None:
+        with self._lock:
+            self._entries.pop(str(organisation_id), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+organisation_cache = OrganisationCache(
+    settings.ORG_CACHE_TTL_SECONDS, settings.ORG_CACHE_MAX_ENTRIES
+)
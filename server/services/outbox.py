@@ -0,0 +1,392 @@
+"""
+Agreement event outbox.
+
+Handlers that change an agreement write an `AgreementEvent` in the same
+transaction (`record_event` / `record_events`), so an event exists if and only
+if the change committed. The relay then claims unprocessed events in batches
+with `FOR UPDATE SKIP LOCKED`, hands each one to its subscribers, and marks
+the batch processed in the same transaction. A relay that dies mid-batch rolls
+back and the events are claimed again, so relay subscribers see every event at
+least once; concurrent relays (several workers) never claim the same event.
+
+The relay polls every OUTBOX_POLL_INTERVAL_SECONDS and is woken immediately
+by `outbox_relay.wake()` after a request commits events.
+
+Relay subscribers run once per event, in whichever worker claimed it (e.g.
+metrics). State that every worker holds for itself (its memory response
+cache, its open SSE streams) subscribes to `outbox_listener` instead: the
+claiming relay sends a NOTIFY with each event id in the transaction that
+marks the batch processed, Postgres delivers it on commit to every worker's
+LISTEN connection, and each listener loads the notified events with one query
+and runs its subscribers. A worker whose LISTEN connection is down misses the
+events relayed meanwhile; it reconnects every OUTBOX_POLL_INTERVAL_SECONDS.
+
+Jobs that change what an organisation reads without writing agreement events
+(the commission batch, instalments marked MISSED) call `notify_invalidation`
+in their transaction; every listener then invalidates that organisation's
+response cache once it commits, whichever process the job ran in.
+
+Subscribers are plain callables taking an event dict (id, organisation_id,
+agreement_id, type, actor_type, meta, created_at). They run on a worker
+thread and must not block; an exception is counted and does not stop the
+other subscribers.
+"""
+
+import asyncio
+import uuid
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Set
+
+from sqlalchemy import insert, select, text
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import SessionLocal, connect_args, engine
+from models import AgreementEvent
+from services.cache import response_cache
+from services.metrics import AGREEMENT_EVENTS, OUTBOX_SUBSCRIBER_ERRORS, SSE_EVENTS_DROPPED
+
+Subscriber = Callable[[dict], None]
+
+# LISTEN/NOTIFY channels carrying relayed event ids and organisation ids
+# whose cached responses are stale
+CHANNEL = "agreement_events"
+INVALIDATION_CHANNEL = "cache_invalidation"
+
+_CLAIM = text("""
+    WITH batch AS (
+        SELECT id
+        FROM agreement_events
+        WHERE processed_at IS NULL
+        ORDER BY created_at, id
+        LIMIT :batch_size
+        FOR UPDATE SKIP LOCKED
+    )
+    UPDATE agreement_events e
+    SET processed_at = now()
+    FROM batch
+    WHERE e.id = batch.id
+    RETURNING e.id, e.organisation_id, e.agreement_id, e.type, e.actor_type, e.meta, e.created_at
+""")
+
+_NOTIFY = text("SELECT pg_notify(:channel, id) FROM unnest(CAST(:ids AS text[])) AS id")
+
+
+def record_event(
+    db: Session,
+    organisation_id,
+    agreement_id,
+    type: str,
+    actor_type: str,
+    meta: Optional[dict] = None,
+) -> None:
+    """Stage one event in `db`'s current transaction."""
+    db.add(AgreementEvent(
+        organisation_id=organisation_id,
+        agreement_id=agreement_id,
+        type=type,
+        actor_type=actor_type,
+        meta=meta
+    ))
+
+
+def record_events(db: Session, rows: List[dict]) -> None:
+    """
+    Insert many events with one multi-row INSERT (bulk operations).
+
+    Each row needs organisation_id, agreement_id, type and actor_type.
+    """
+    if not rows:
+        return
+    now = datetime.now(timezone.utc)
+    for row in rows:
+        row.setdefault("id", uuid.uuid4())
+        row.setdefault("meta", None)
+        row.setdefault("created_at", now)
+    db.execute(insert(AgreementEvent), rows)
+
+
+def notify_invalidation(db: Session, organisation_ids) -> None:
+    """
+    Stage a response cache invalidation for every API worker in `db`'s
+    transaction; it is delivered only if the transaction commits.
+    """
+    ids = sorted({str(organisation_id) for organisation_id in organisation_ids})
+    if ids:
+        db.execute(_NOTIFY, {"channel": INVALIDATION_CHANNEL, "ids": ids})
+
+
+def _publish(subscribers: Dict[str, Subscriber], event: dict) -> None:
+    for name, fn in subscribers.items():
+        try:
+            fn(event)
+        except Exception:
+            OUTBOX_SUBSCRIBER_ERRORS.labels(name).inc()
+
+
+class OutboxRelay:
+    """
+    Claims committed agreement events, publishes them once to its subscribers
+    and notifies every worker's `OutboxListener`.
+
+    Attributes:
+        batch_size: Events claimed per transaction
+        poll_interval: Seconds between polls when not woken
+    """
+
+    def __init__(self, batch_size: int, poll_interval: float):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.subscribers: Dict[str, Subscriber] = {}
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, fn: Subscriber) -> Subscriber:
+        """Register a once-per-event subscriber; usable as a decorator."""
+        self.subscribers[fn.__name__] = fn
+        return fn
+
+    def relay_once(self) -> int:
+        """
+        Claim, publish and mark one batch of events.
+
+        Returns:
+            Number of events relayed
+        """
+        with SessionLocal() as db:
+            rows = db.execute(_CLAIM, {"batch_size": self.batch_size}).all()
+            events = sorted((dict(row._mapping) for row in rows), key=lambda e: (e["created_at"], e["id"]))
+            for event in events:
+                _publish(self.subscribers, event)
+            if events:
+                # Delivered to listeners only if the batch commits
+                db.execute(_NOTIFY, {"channel": CHANNEL, "ids": [str(event["id"]) for event in events]})
+            db.commit()
+        return len(events)
+
+    def wake(self) -> None:
+        """Relay now instead of at the next poll; call from the event loop."""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _run(self) -> None:
+        while True:
+            self._wake.clear()
+            try:
+                # Keep draining while batches come back full
+                while await asyncio.to_thread(self.relay_once) == self.batch_size:
+                    pass
+            except Exception:
+                # Database unavailable; events stay unprocessed until the next poll
+                pass
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._wake = None
+
+
+class OutboxListener:
+    """
+    Runs this process's subscribers for every relayed event, whichever worker
+    relayed it.
+
+    Holds one LISTEN connection outside the pool, watched by the event loop;
+    notified ids are collected and loaded in one query per wake-up. Cache
+    invalidations notified by jobs are applied directly.
+
+    Attributes:
+        retry_interval: Seconds between reconnection attempts
+    """
+
+    def __init__(self, retry_interval: float):
+        self.retry_interval = retry_interval
+        self.subscribers: Dict[str, Subscriber] = {}
+        self._pending: List[str] = []
+        self._invalidations: Set[str] = set()
+        self._ready: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def subscribe(self, fn: Subscriber) -> Subscriber:
+        """Register a per-worker subscriber; usable as a decorator."""
+        self.subscribers[fn.__name__] = fn
+        return fn
+
+    def dispatch(self, ids: List[str], organisation_ids: Set[str] = frozenset()) -> int:
+        """
+        Invalidate the notified organisations' cached responses, then load the
+        notified events and publish them in order.
+
+        Returns:
+            Number of events published
+        """
+        for organisation_id in organisation_ids:
+            response_cache.invalidate(organisation_id)
+        if not ids:
+            return 0
+        with SessionLocal() as db:
+            rows = db.execute(
+                select(
+                    AgreementEvent.id, AgreementEvent.organisation_id, AgreementEvent.agreement_id,
+                    AgreementEvent.type, AgreementEvent.actor_type, AgreementEvent.meta,
+                    AgreementEvent.created_at,
+                )
+                .where(AgreementEvent.id.in_(ids))
+                .order_by(AgreementEvent.created_at, AgreementEvent.id)
+            ).all()
+        for row in rows:
+            _publish(self.subscribers, dict(row._mapping))
+        return len(rows)
+
+    def _connect(self):
+        args, params = engine.dialect.create_connect_args(engine.url)
+        connection = engine.dialect.connect(*args, **{**params, **connect_args})
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute(f"LISTEN {CHANNEL}; LISTEN {INVALIDATION_CHANNEL}")
+        return connection
+
+    async def _listen(self) -> None:
+        connection = await asyncio.to_thread(self._connect)
+        loop = asyncio.get_running_loop()
+        lost = asyncio.Event()
+
+        def on_readable():
+            try:
+                connection.poll()
+            except Exception:
+                lost.set()
+                return
+            while connection.notifies:
+                notification = connection.notifies.pop(0)
+                if notification.channel == INVALIDATION_CHANNEL:
+                    self._invalidations.add(notification.payload)
+                else:
+                    self._pending.append(notification.payload)
+            if self._pending or self._invalidations:
+                self._ready.set()
+
+        loop.add_reader(connection.fileno(), on_readable)
+        try:
+            await lost.wait()
+        finally:
+            loop.remove_reader(connection.fileno())
+            connection.close()
+
+    async def _run_listen(self) -> None:
+        while True:
+            try:
+                await self._listen()
+            except Exception:
+                # Database unavailable; events relayed meanwhile are missed here
+                pass
+            await asyncio.sleep(self.retry_interval)
+
+    async def _run_dispatch(self) -> None:
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            ids, self._pending = self._pending, []
+            organisation_ids, self._invalidations = self._invalidations, set()
+            try:
+                await asyncio.to_thread(self.dispatch, ids, organisation_ids)
+            except Exception:
+                # Database unavailable; these events are skipped in this worker
+                pass
+
+    def start(self) -> None:
+        if not self._tasks:
+            self._ready = asyncio.Event()
+            self._tasks = [
+                asyncio.create_task(self._run_listen()),
+                asyncio.create_task(self._run_dispatch()),
+            ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        self._ready = None
+
+
+class EventBroadcaster:
+    """
+    Fans relayed events out to open server-sent event streams, per organisation.
+
+    Streams live on the event loop while the relay runs on a worker thread,
+    so delivery goes through `call_soon_threadsafe`. A stream whose queue is
+    full (a stalled client) drops events rather than slowing the relay.
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._streams: Dict[str, Set[asyncio.Queue]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def open(self, organisation_id: str) -> asyncio.Queue:
+        self._loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._streams.setdefault(organisation_id, set()).add(queue)
+        return queue
+
+    def close(self, organisation_id: str, queue: asyncio.Queue) -> None:
+        streams = self._streams.get(organisation_id)
+        if streams is not None:
+            streams.discard(queue)
+            if not streams:
+                del self._streams[organisation_id]
+
+    def _deliver(self, organisation_id: str, event: dict) -> None:
+        for queue in list(self._streams.get(organisation_id, ())):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                SSE_EVENTS_DROPPED.inc()
+
+    def publish(self, event: dict) -> None:
+        organisation_id = str(event["organisation_id"])
+        if self._loop is None or organisation_id not in self._streams:
+            return
+        self._loop.call_soon_threadsafe(self._deliver, organisation_id, event)
+
+
+outbox_relay = OutboxRelay(settings.OUTBOX_BATCH_SIZE, settings.OUTBOX_POLL_INTERVAL_SECONDS)
+outbox_listener = OutboxListener(settings.OUTBOX_POLL_INTERVAL_SECONDS)
+event_broadcaster = EventBroadcaster(settings.SSE_QUEUE_SIZE)
+
+
+@outbox_listener.subscribe
+def cache_invalidation(event: dict) -> None:
+    # Request handlers invalidate synchronously for read-your-writes; this
+    # covers changes committed outside this process's requests (CLI jobs, the
+    # instalment sweep), which the memory backend would otherwise never see
+    response_cache.invalidate(str(event["organisation_id"]))
+
+
+@outbox_relay.subscribe
+def event_metrics(event: dict) -> None:
+    AGREEMENT_EVENTS.labels(event["type"]).inc()
+
+
+@outbox_listener.subscribe
+def server_sent_events(event: dict) -> None:
+    event_broadcaster.publish(event)
@@ -0,0 +1,124 @@
+"""
+Cached database readiness state.
+
+Probes run on a background task at a fixed interval, so `/readyz` and
+`/health` answer from memory and never open a connection themselves. A load
+balancer probing many times per second therefore costs nothing on Postgres.
+"""
+
+import asyncio
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.pool import QueuePool
+
+from config import settings
+from database import engine
+from services.metrics import DB_POOL_CHECKED_OUT
+
+
+class DatabaseProbe:
+    """
+    Periodically runs `SELECT 1` and keeps the latest result in memory.
+
+    Attributes:
+        engine: SQLAlchemy engine to probe
+        interval: Seconds between probes
+        latencies: Recent probe round-trip times in milliseconds
+    """
+
+    def __init__(self, engine, interval: float, history: int = 20):
+        self.engine = engine
+        self.interval = interval
+        self.latencies = deque(maxlen=history)
+        self.ok = False
+        self.error: Optional[str] = None
+        self.checked_at: Optional[datetime] = None
+        self._checked_monotonic: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def check(self) -> None:
+        """Run one probe synchronously and record the outcome."""
+        start = time.perf_counter()
+        try:
+            with self.engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+            self.latencies.append((time.perf_counter() - start) * 1000)
+            self.ok = True
+            self.error = None
+        except Exception as e:
+            self.ok = False
+            self.error = type(e).__name__
+        self.checked_at = datetime.now(timezone.utc)
+        self._checked_monotonic = time.monotonic()
+
+    @property
+    def stale(self) -> bool:
+        """True if no probe has completed within three intervals."""
+        if self._checked_monotonic is None:
+            return True
+        return time.monotonic() - self._checked_monotonic > self.interval * 3
+
+    @property
+    def ready(self) -> bool:
+        return self.ok and not self.stale
+
+    def pool_stats(self) -> dict:
+        """Report connection usage and, for bounded pools, saturation."""
+        pool = self.engine.pool
+        if isinstance(pool, QueuePool):
+            capacity = pool.size() + pool._max_overflow
+            checked_out = pool.checkedout()
+            return {
+                "type": "QueuePool",
+                "checked_out": checked_out,
+                "capacity": capacity,
+                "saturation": round(checked_out / capacity, 3) if capacity else None,
+            }
+        return {
+            "type": type(pool).__name__,
+            "checked_out": int(DB_POOL_CHECKED_OUT._default.value),
+            "capacity": None,
+            "saturation": None,
+        }
+
+    def report(self) -> dict:
+        latencies = sorted(self.latencies)
+        return {
+            "ready": self.ready,
+            "database": "connected" if self.ok else "disconnected",
+            "error": self.error,
+            "stale": self.stale,
+            "checked_at": self.checked_at.isoformat() if self.checked_at else None,
+            "latency_ms": {
+                "last": round(self.latencies[-1], 2) if latencies else None,
+                "p50": round(latencies[len(latencies) // 2], 2) if latencies else None,
+                "max": round(latencies[-1], 2) if latencies else None,
+            },
+            "pool": self.pool_stats(),
+        }
+
+    async def _run(self) -> None:
+        while True:
+            # The probe uses a blocking driver, so keep it off the event loop
+            await asyncio.to_thread(self.check)
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+database_probe = DatabaseProbe(engine, settings.READINESS_CHECK_INTERVAL_SECONDS)
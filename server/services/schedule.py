@@ -0,0 +1,127 @@
+"""
+Instalment due-date generation.
+
+Instalment `i` (0-based) falls due `i` calendar months after the anchor
+(signing) date, on the same day of the month, clamped to the month's last day
+when that day does not exist: an agreement signed on 31 January is collected
+on 28/29 February, 31 March, 30 April, ... rather than drifting by fixed
+30-day steps.
+
+An optional business-day roll (SCHEDULE_BUSINESS_DAY_ROLL) moves due dates
+that land on weekends or holidays, using NumPy's business-day conventions
+(`following`, `preceding`, `modifiedfollowing`, `modifiedpreceding`). The
+holiday calendar is pluggable: pass any dates to `ScheduleGenerator`, or point
+SCHEDULE_HOLIDAYS_FILE at a file of YYYY-MM-DD lines.
+
+Month offsets are a precomputed array and the holiday calendar is compiled
+once into a `numpy.busdaycalendar`, so `due_dates_batch` generates schedules
+for thousands of agreements in a handful of array operations.
+"""
+
+from datetime import date, datetime, timezone
+from typing import Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+
+from config import settings
+
+# Longest supported term; offsets up to this are precomputed
+MAX_TERM_MONTHS = 600
+ROLLS = ("none", "following", "preceding", "modifiedfollowing", "modifiedpreceding")
+
+_MONTH_OFFSETS = np.arange(MAX_TERM_MONTHS).astype("timedelta64[M]")
+
+
+def anchor_day(value: Union[date, datetime]) -> np.datetime64:
+    """Calendar day of `value`, in UTC for timezone-aware datetimes."""
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        value = value.date()
+    return np.datetime64(value, "D")
+
+
+def load_holidays(path: Optional[str]) -> List[date]:
+    """Read YYYY-MM-DD dates, one per line; blank lines and `#` comments are skipped."""
+    if not path:
+        return []
+    with open(path) as f:
+        return [
+            date.fromisoformat(line.split("#", 1)[0].strip())
+            for line in f
+            if line.split("#", 1)[0].strip()
+        ]
+
+
+class ScheduleGenerator:
+    """
+    Month-anniversary due dates with optional business-day adjustment.
+
+    Attributes:
+        roll: "none" or a NumPy business-day roll convention
+        calendar: Compiled weekmask and holidays used when rolling
+    """
+
+    def __init__(
+        self,
+        roll: str = "none",
+        holidays: Iterable[date] = (),
+        weekmask: str = "Mon Tue Wed Thu Fri",
+    ):
+        if roll not in ROLLS:
+            raise ValueError(f"Unknown SCHEDULE_BUSINESS_DAY_ROLL: {roll}")
+        self.roll = roll
+        self.calendar = np.busdaycalendar(
+            weekmask=weekmask, holidays=np.array(list(holidays), dtype="datetime64[D]")
+        )
+
+    def _generate(self, anchors: np.ndarray, months: int) -> np.ndarray:
+        """(len(anchors), months) array of datetime64[D] due dates."""
+        if months > MAX_TERM_MONTHS:
+            raise ValueError(f"Term longer than {MAX_TERM_MONTHS} months")
+        anchor_months = anchors.astype("datetime64[M]")
+        # Day of month as an offset from the 1st
+        day_offset = (anchors - anchor_months.astype("datetime64[D]"))[:, None]
+        target = anchor_months[:, None] + _MONTH_OFFSETS[:months]
+        first = target.astype("datetime64[D]")
+        last = (target + 1).astype("datetime64[D]") - np.timedelta64(1, "D")
+        due = np.minimum(first + day_offset, last)
+        if self.roll != "none":
+            due = np.busday_offset(due, 0, roll=self.roll, busdaycal=self.calendar)
+        return due
+
+    def due_dates_batch(
+        self,
+        anchors: Sequence[Union[date, datetime]],
+        term_months: Sequence[int],
+    ) -> List[np.ndarray]:
+        """
+        Due dates for many agreements at once. `anchors` may also be a
+        datetime64 array, which skips the per-element conversion.
+
+        Returns:
+            One datetime64[D] array of length term_months[k] per anchor
+        """
+        if not len(anchors):
+            return []
+        if isinstance(anchors, np.ndarray):
+            days = anchors.astype("datetime64[D]")
+        else:
+            days = np.array([anchor_day(a) for a in anchors], dtype="datetime64[D]")
+        terms = np.asarray(term_months, dtype=np.int64)
+        due = self._generate(days, int(terms.max()))
+        return [row[:term] for row, term in zip(due, terms)]
+
+    def due_dates(self, anchor: Union[date, datetime], term_months: int) -> List[datetime]:
+        """Due dates for one agreement, as midnight-UTC datetimes."""
+        due = self._generate(np.array([anchor_day(anchor)]), term_months)[0]
+        return [
+            datetime.combine(day, datetime.min.time(), tzinfo=timezone.utc)
+            for day in due.astype(object)
+        ]
+
+
+schedule_generator = ScheduleGenerator(
+    settings.SCHEDULE_BUSINESS_DAY_ROLL,
+    load_holidays(settings.SCHEDULE_HOLIDAYS_FILE),
+)
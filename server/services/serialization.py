@@ -0,0 +1,98 @@
+"""
+Fast JSON serialization helpers.
+
+FastAPI passes whatever a route returns through `jsonable_encoder`, which walks
+ORM instances attribute by attribute. Hot list endpoints instead select plain
+column tuples and return an `ORJSONResponse` directly: orjson natively encodes
+UUIDs, datetimes and enums, so no per-field Python work is needed.
+"""
+
+from typing import Iterable, List, Optional, Sequence
+
+from fastapi import HTTPException, Query
+from fastapi.responses import ORJSONResponse
+
+
+def schema_columns(model, schema, fields: Optional[List[str]] = None) -> list:
+    """
+    Mapped columns backing the fields of a response schema.
+
+    Args:
+        model: SQLAlchemy model to select from
+        schema: Pydantic response schema whose fields define the column set
+        fields: Optional sparse fieldset (already validated) to narrow to
+
+    Returns:
+        Column attributes in schema field order, for tuple selects
+    """
+    columns = model.__table__.columns
+    names = fields if fields is not None else schema.model_fields
+    return [getattr(model, name) for name in names if name in columns]
+
+
+def parse_fields(fields: Optional[str], schema) -> Optional[List[str]]:
+    """
+    Parse and validate a comma-separated `fields=` value against a schema.
+
+    `id` is always included so clients can correlate rows.
+
+    Raises:
+        HTTPException: 400 if any requested field is not in the schema
+    """
+    if not fields:
+        return None
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in schema.model_fields]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)}. "
+                   f"Allowed fields: {', '.join(schema.model_fields)}"
+        )
+    names = ["id"] if "id" in schema.model_fields else []
+    for name in requested:
+        if name not in names:
+            names.append(name)
+    return names
+
+
+def sparse_fields(schema):
+    """
+    Dependency factory for a `fields=` query parameter validated against `schema`.
+
+    Usage:
+        @router.get("")
+        def list_things(fields: Optional[List[str]] = Depends(sparse_fields(ThingResponse))):
+            ...
+    """
+    def dependency(
+        fields: Optional[str] = Query(
+            None, description="Comma-separated subset of response fields to return"
+        )
+    ) -> Optional[List[str]]:
+        return parse_fields(fields, schema)
+    return dependency
+
+
+def rows_to_dicts(rows: Sequence, keys: Iterable[str] = None) -> List[dict]:
+    """
+    Convert SQLAlchemy `Row` tuples to dicts keyed by column name.
+
+    Args:
+        rows: Result rows from a column (not entity) select
+        keys: Column names; taken from the first row when omitted
+    """
+    if not rows:
+        return []
+    keys = tuple(keys) if keys is not None else rows[0]._fields
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def row_to_dict(row) -> dict:
+    """Convert a single `Row` to a dict keyed by column name."""
+    return dict(zip(row._fields, row))
+
+
+def json_response(content, status_code: int = 200, headers: dict = None) -> ORJSONResponse:
+    """Return pre-shaped content without going through `jsonable_encoder`."""
+    return ORJSONResponse(content, status_code=status_code, headers=headers)
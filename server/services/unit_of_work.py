@@ -0,0 +1,85 @@
+"""
+Single-transaction writes with their audit record.
+
+Handlers used to commit the entity, refresh it, then add an `AuditLog` and
+commit again: two transactions, an extra SELECT, and a window where a crash
+loses the audit row. A `UnitOfWork` stages the entity and its audit record in
+one transaction and commits once. The audit record goes through the audit
+sink, so in async mode it is queued when the transaction commits.
+
+Usage:
+    uow = UnitOfWork(db, auth)
+    client = uow.add(models.Client(...))
+    uow.flush()  # assigns client.id
+    uow.audit("CREATE", "CLIENT", after={"id": str(client.id)})
+    return uow.commit(lambda: schemas.ClientResponse.model_validate(client))
+"""
+
+from typing import Callable, Optional, TypeVar
+
+from sqlalchemy.orm import Session
+
+from middleware.auth import AuthContext
+from services.audit_sink import audit_sink
+from services.cache import response_cache
+
+T = TypeVar("T")
+
+
+class UnitOfWork:
+    """
+    Stages writes for one organisation and commits them in a single transaction.
+
+    Attributes:
+        db: Request session
+        auth: Authenticated caller; supplies the organisation and actor type
+    """
+
+    def __init__(self, db: Session, auth: AuthContext):
+        self.db = db
+        self.auth = auth
+
+    def add(self, entity: T) -> T:
+        self.db.add(entity)
+        return entity
+
+    def flush(self) -> None:
+        """Send pending INSERT/UPDATEs so generated IDs are available."""
+        self.db.flush()
+
+    def audit(
+        self,
+        action: str,
+        entity: str,
+        before: Optional[dict] = None,
+        after: Optional[dict] = None,
+    ) -> None:
+        """Record an audit event; it is only emitted if this unit commits."""
+        audit_sink.record(
+            self.db,
+            self.auth.organisation_id,
+            self.auth.role,
+            action,
+            entity,
+            before=before,
+            after=after
+        )
+
+    def commit(self, build: Optional[Callable[[], T]] = None) -> Optional[T]:
+        """
+        Flush, build the response, then commit once.
+
+        The response is built before the commit because committing expires
+        every loaded attribute; building afterwards would cost a refresh SELECT.
+
+        Args:
+            build: Produces the response from the flushed entities
+
+        Returns:
+            Whatever `build` returned, or None
+        """
+        self.db.flush()
+        result = build() if build is not None else None
+        self.db.commit()
+        response_cache.invalidate(self.auth.organisation_id)
+        return result
@@ -0,0 +1,14 @@
+import os
+import sys
+
+import pytest
+
+# Tests import the app modules the way uvicorn does, from the server directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def pytest_collection_modifyitems(config, items):
+    if not os.environ.get("DATABASE_URL"):
+        skip = pytest.mark.skip(reason="DATABASE_URL is not set")
+        for item in items:
+            item.add_marker(skip)
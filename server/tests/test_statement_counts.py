@@ -0,0 +1,94 @@
+"""
+List endpoints must issue the same number of statements whatever the page
+size: one aggregate for the validators and one page query, never a query per
+row. Runs against DATABASE_URL in a throwaway organisation that is deleted
+afterwards.
+"""
+
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import event
+
+ROWS = 6
+
+
+@pytest.fixture(scope="module")
+def api():
+    from fastapi.testclient import TestClient
+
+    import main
+    import models
+    from database import SessionLocal
+
+    now = datetime.now(timezone.utc)
+    with SessionLocal() as db:
+        organisation = models.Organisation(name="Statement count test")
+        db.add(organisation)
+        db.flush()
+        for i in range(ROWS):
+            client = models.Client(
+                organisation_id=organisation.id, first_name="Test", last_name=str(i),
+                email=f"statements-{i}@example.com",
+            )
+            db.add(client)
+            db.flush()
+            policy = models.Policy(
+                organisation_id=organisation.id, client_id=client.id, insurer="Aviva",
+                product_type="Motor", policy_number=f"STMT-{i}", start_date=now,
+                end_date=now, premium_amount_pennies=120000,
+            )
+            db.add(policy)
+            db.flush()
+            db.add(models.Agreement(
+                organisation_id=organisation.id, client_id=client.id, policy_id=policy.id,
+                principal_amount_pennies=120000, apr_bps=995, term_months=12, broker_fee_bps=200,
+            ))
+        db.commit()
+        organisation_id = organisation.id
+
+    headers = {"X-User-Id": str(uuid.uuid4()), "X-Org-Id": str(organisation_id), "X-Role": "OWNER"}
+    try:
+        yield TestClient(main.app), headers
+    finally:
+        with SessionLocal() as db:
+            db.query(models.Organisation).filter(models.Organisation.id == organisation_id).delete()
+            db.commit()
+
+
+@contextmanager
+def counting_statements():
+    from database import engine
+
+    statements = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", on_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
+
+
+@pytest.mark.parametrize("path, size_param", [
+    ("/api/broker/clients", "limit"),
+    ("/api/broker/policies", "limit"),
+    ("/api/broker/agreements", "limit"),
+])
+def test_list_statement_count_is_constant(api, path, size_param):
+    client, headers = api
+    # Warm the organisation cache so only the list queries are counted
+    assert client.get(path, params={size_param: 2}, headers=headers).status_code == 200
+
+    counts = {}
+    for size in (1, ROWS):
+        with counting_statements() as statements:
+            response = client.get(path, params={size_param: size}, headers=headers)
+        assert response.status_code == 200
+        counts[size] = len(statements)
+
+    assert counts[1] == counts[ROWS], counts
@@ -0,0 +1,64 @@
+-- Monthly range partitioning for audit_logs
+-- The table is rebuilt as a partitioned table on created_at. The primary key
+-- becomes (id, created_at) because a partitioned table's unique constraints
+-- must include the partition key. A DEFAULT partition catches rows outside
+-- any monthly partition; `python -m services.audit_partitions` pre-creates
+-- upcoming months (moving any matching rows out of the default partition)
+-- and detaches/archives or drops months past the retention period.
+
+ALTER TABLE public.audit_logs RENAME TO audit_logs_unpartitioned;
+ALTER TABLE public.audit_logs_unpartitioned RENAME CONSTRAINT audit_logs_pkey TO audit_logs_unpartitioned_pkey;
+
+CREATE TABLE public.audit_logs (
+    id UUID NOT NULL DEFAULT gen_random_uuid(),
+    organisation_id UUID NOT NULL REFERENCES public.organisations(id) ON DELETE CASCADE,
+    actor_type TEXT NOT NULL,
+    action TEXT NOT NULL,
+    entity TEXT NOT NULL,
+    before JSONB,
+    after JSONB,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+CREATE TABLE public.audit_logs_default PARTITION OF public.audit_logs DEFAULT;
+
+-- One partition per month from the oldest existing row through three months ahead
+DO $$
+DECLARE
+    first_month DATE;
+    m DATE;
+BEGIN
+    SELECT date_trunc('month', COALESCE(MIN(created_at), now()) AT TIME ZONE 'UTC')::date
+    INTO first_month
+    FROM public.audit_logs_unpartitioned;
+
+    FOR m IN
+        SELECT generate_series(first_month, (date_trunc('month', now() AT TIME ZONE 'UTC') + interval '3 months')::date, interval '1 month')::date
+    LOOP
+        EXECUTE format(
+            'CREATE TABLE public.%I PARTITION OF public.audit_logs FOR VALUES FROM (%L) TO (%L)',
+            'audit_logs_' || to_char(m, 'YYYY_MM'),
+            m::timestamp AT TIME ZONE 'UTC',
+            (m + interval '1 month')::timestamp AT TIME ZONE 'UTC'
+        );
+    END LOOP;
+END $$;
+
+INSERT INTO public.audit_logs (id, organisation_id, actor_type, action, entity, before, after, created_at)
+SELECT id, organisation_id, actor_type, action, entity, before, after, created_at
+FROM public.audit_logs_unpartitioned;
+
+DROP TABLE public.audit_logs_unpartitioned;
+
+-- Indexes are created on every partition automatically
+CREATE INDEX idx_audit_logs_organisation_id ON public.audit_logs(organisation_id);
+CREATE INDEX idx_audit_logs_created_at ON public.audit_logs(created_at);
+
+-- Archived (detached) partitions are moved here by the maintenance command
+CREATE SCHEMA IF NOT EXISTS audit_archive;
+
+ALTER TABLE public.audit_logs ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Active members can view audit logs" ON public.audit_logs
+    FOR SELECT USING (public.is_active_member_of_org(organisation_id));
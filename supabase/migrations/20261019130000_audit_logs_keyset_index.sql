@@ -0,0 +1,8 @@
+-- Composite index for the audit trail endpoint
+-- Pages are filtered by organisation and ordered by (created_at, id); the
+-- composite index serves both, and makes the single-column
+-- organisation_id index redundant.
+
+CREATE INDEX idx_audit_logs_organisation_id_created_at ON public.audit_logs(organisation_id, created_at, id);
+
+DROP INDEX IF EXISTS public.idx_audit_logs_organisation_id;
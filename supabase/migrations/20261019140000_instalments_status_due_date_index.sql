@@ -0,0 +1,6 @@
+-- Index for the instalment status sweep
+-- services/instalment_status.py repeatedly looks up UPCOMING instalments
+-- past their due date and MISSED instalments per agreement; without this
+-- index each batch is a full scan of instalments.
+
+CREATE INDEX idx_instalments_status_due_date ON public.instalments(status, due_date);
@@ -0,0 +1,33 @@
+-- Broker commission lines and batch job watermarks
+-- services/commission.py writes one BROKER_FEE line per signed or activated
+-- agreement. The unique (agreement_id, type) constraint makes reruns
+-- idempotent; job_watermarks records where the last incremental run stopped.
+
+CREATE TABLE public.commission_lines (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    organisation_id UUID NOT NULL REFERENCES public.organisations(id) ON DELETE CASCADE,
+    agreement_id UUID NOT NULL REFERENCES public.agreements(id) ON DELETE CASCADE,
+    type TEXT NOT NULL,
+    amount_pennies INTEGER NOT NULL,
+    currency TEXT NOT NULL DEFAULT 'GBP',
+    earned_at TIMESTAMPTZ NOT NULL,
+    calculated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    CONSTRAINT uq_commission_lines_agreement_id_type UNIQUE (agreement_id, type)
+);
+
+CREATE INDEX idx_commission_lines_organisation_id_earned_at ON public.commission_lines(organisation_id, earned_at);
+
+CREATE TABLE public.job_watermarks (
+    name TEXT PRIMARY KEY,
+    watermark TIMESTAMPTZ NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- Incremental jobs scan agreements changed since their watermark
+CREATE INDEX idx_agreements_updated_at ON public.agreements(updated_at);
+
+ALTER TABLE public.commission_lines ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.job_watermarks ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Active members can view commission lines" ON public.commission_lines
+    FOR SELECT USING (public.is_active_member_of_org(organisation_id));
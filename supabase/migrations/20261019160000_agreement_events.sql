@@ -0,0 +1,23 @@
+-- Agreement events: agreement history and transactional outbox
+-- Events are written in the same transaction as the agreement change and
+-- relayed to in-process subscribers by services/outbox.py, which sets
+-- processed_at. The partial index keeps the relay's scan to unrelayed rows.
+
+CREATE TABLE public.agreement_events (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    organisation_id UUID NOT NULL REFERENCES public.organisations(id) ON DELETE CASCADE,
+    agreement_id UUID NOT NULL REFERENCES public.agreements(id) ON DELETE CASCADE,
+    type TEXT NOT NULL,
+    actor_type TEXT NOT NULL,
+    meta JSONB,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    processed_at TIMESTAMPTZ
+);
+
+CREATE INDEX idx_agreement_events_agreement_id ON public.agreement_events(agreement_id);
+CREATE INDEX idx_agreement_events_unprocessed ON public.agreement_events(created_at) WHERE processed_at IS NULL;
+
+ALTER TABLE public.agreement_events ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Active members can view agreement events" ON public.agreement_events
+    FOR SELECT USING (public.is_active_member_of_org(organisation_id));
@@ -0,0 +1,5 @@
+-- Agreement version for optimistic concurrency
+-- Every status transition increments it; clients send it back in If-Match so
+-- a transition based on a stale read fails with 412 instead of overwriting.
+
+ALTER TABLE public.agreements ADD COLUMN version INTEGER NOT NULL DEFAULT 1;
@@ -0,0 +1,5 @@
+-- Case-insensitive client email lookups per organisation
+-- Bulk client imports skip emails the organisation already has, comparing
+-- lower(email) for a whole chunk of rows in one query.
+
+CREATE INDEX idx_clients_organisation_id_email_lower ON public.clients(organisation_id, lower(email));
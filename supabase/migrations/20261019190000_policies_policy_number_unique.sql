@@ -0,0 +1,9 @@
+-- Policy numbers are unique within an organisation
+-- Policy imports upsert on (organisation_id, policy_number), which needs a
+-- unique index to target with ON CONFLICT. It replaces the global uniqueness
+-- from the initial schema: two brokers can hold the same insurer reference.
+
+ALTER TABLE public.policies DROP CONSTRAINT IF EXISTS policies_policy_number_key;
+
+ALTER TABLE public.policies
+    ADD CONSTRAINT uq_policies_organisation_id_policy_number UNIQUE (organisation_id, policy_number);
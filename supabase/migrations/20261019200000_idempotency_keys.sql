@@ -0,0 +1,20 @@
+-- Idempotency keys: stored responses of create requests sent with an
+-- Idempotency-Key header, replayed to retries until expires_at.
+-- Expired rows are deleted by `python -m services.idempotency`.
+
+CREATE TABLE public.idempotency_keys (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    organisation_id UUID NOT NULL REFERENCES public.organisations(id) ON DELETE CASCADE,
+    key TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    status_code INTEGER,
+    response JSONB,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    expires_at TIMESTAMPTZ NOT NULL,
+    CONSTRAINT uq_idempotency_keys_organisation_id_key UNIQUE (organisation_id, key)
+);
+
+CREATE INDEX idx_idempotency_keys_expires_at ON public.idempotency_keys(expires_at);
+
+-- Only the API (service role) reads and writes these rows
+ALTER TABLE public.idempotency_keys ENABLE ROW LEVEL SECURITY;
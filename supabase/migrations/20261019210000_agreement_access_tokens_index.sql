@@ -0,0 +1,4 @@
+-- Customer portal token lookups use the UNIQUE (token_hash) constraint's
+-- index; the separate non-unique index on the same column only costs writes.
+
+DROP INDEX IF EXISTS public.idx_agreement_access_tokens_token_hash;
@@ -0,0 +1,37 @@
+-- Agreement signing and activation dates
+-- Agreements used to be created with signed_at set to the creation time (and
+-- activated_at a day later), and transitions kept those values, so commission
+-- lines were dated by creation rather than by signing. New agreements leave
+-- both NULL until the transition sets them. This repairs existing rows:
+-- dates come from the STATUS_CHANGED events where there are any, agreements
+-- not yet signed or activated lose the placeholder, and commission lines
+-- follow their agreement's corrected date.
+
+WITH reached AS (
+    SELECT agreement_id,
+           min(created_at) FILTER (WHERE meta->>'to' = 'SIGNED') AS signed_at,
+           min(created_at) FILTER (WHERE meta->>'to' = 'ACTIVE') AS activated_at
+    FROM public.agreement_events
+    WHERE type = 'STATUS_CHANGED'
+    GROUP BY agreement_id
+)
+UPDATE public.agreements a
+SET signed_at = COALESCE(r.signed_at, a.signed_at),
+    activated_at = COALESCE(r.activated_at, a.activated_at)
+FROM reached r
+WHERE r.agreement_id = a.id;
+
+UPDATE public.agreements
+SET signed_at = NULL, activated_at = NULL
+WHERE status IN ('DRAFT', 'PROPOSED');
+
+UPDATE public.agreements
+SET activated_at = NULL
+WHERE status = 'SIGNED';
+
+UPDATE public.commission_lines c
+SET earned_at = COALESCE(a.signed_at, a.activated_at)
+FROM public.agreements a
+WHERE a.id = c.agreement_id
+  AND COALESCE(a.signed_at, a.activated_at) IS NOT NULL
+  AND c.earned_at IS DISTINCT FROM COALESCE(a.signed_at, a.activated_at);